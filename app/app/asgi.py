@@ -2,6 +2,8 @@
 ASGI config for app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The recipe reads are served by async views, see app.asgi_urls. Run it with
+an ASGI server, e.g. ``uvicorn app.asgi:application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
@@ -9,8 +11,12 @@ https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+from core.async_views import AsyncViewsASGIHandler  # noqa: E402
+
+application = AsyncViewsASGIHandler()
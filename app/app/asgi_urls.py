@@ -0,0 +1,17 @@
+"""URL configuration served by the ASGI handler
+
+Same routes as app.urls, with the recipe reads served by async views.
+"""
+from core.async_views import async_patterns
+
+from app.urls import urlpatterns as sync_urlpatterns
+
+
+ASYNC_VIEWS = (
+    'recipe:recipe-list',
+    'recipe:recipe-detail',
+    'recipe:tag-list',
+    'recipe:ingredient-list',
+)
+
+urlpatterns = async_patterns(sync_urlpatterns, ASYNC_VIEWS)
@@ -11,7 +11,9 @@ https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -38,14 +40,16 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
-    'core',
+    'core.apps.CoreConfig',
     'user',
-    'recipe',
+    'recipe.apps.RecipeConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,17 +83,155 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
+# Connections are kept open for DB_CONN_MAX_AGE seconds. With a
+# DB_POOL_SIZE they are returned to an in-process pool after each request
+# instead, see core.backends.postgresql. Behind pgbouncer in transaction
+# mode set DB_PGBOUNCER, as server-side cursors don't survive it.
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.backends.postgresql' if DB_POOL_SIZE
+        else 'django.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASS')
+        'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(
+            os.environ.get('DB_CONN_MAX_AGE', 0 if DB_POOL_SIZE else 60)
+        ),
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get(
+            'DB_PGBOUNCER', '0'
+        ) == '1',
+        'POOL': {
+            'MAX_SIZE': DB_POOL_SIZE,
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'CHECK_AFTER': float(os.environ.get('DB_POOL_CHECK_AFTER', 5)),
+        },
     }
 }
 
 
+# Read replicas of the default database, listed by DB_REPLICA_HOSTS. Safe
+# requests of the views using core.routers.ReplicaReadMixin read from a
+# replica, picked in turns or as the least lagging one, and users are
+# pinned to the primary for REPLICA_PIN_SECONDS after writing. The pins
+# live in the REPLICA_PIN_CACHE_ALIAS cache, which must be shared by every
+# process (not locmem) when there are replicas.
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))
+):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_SELECTION = os.environ.get('DB_REPLICA_SELECTION', 'round_robin')
+REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 5))
+REPLICA_LAG_CHECK_INTERVAL = float(
+    os.environ.get('DB_REPLICA_LAG_CHECK_INTERVAL', 1)
+)
+REPLICA_PIN_CACHE_ALIAS = 'default'
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 5))
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
+    # Revoked signed tokens, which have to outlive every other entry. It is
+    # kept apart and never culled (max_entries is ignored by memcached, so
+    # give it an instance of its own)
+    'token_revocations': {
+        'BACKEND': os.environ.get(
+            'TOKEN_REVOCATION_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get(
+            'TOKEN_REVOCATION_CACHE_LOCATION',
+            'token-revocations'
+        ),
+        'max_entries': sys.maxsize,
+    },
+}
+
+# Cache alias and lifetime (seconds) of authenticated tokens. Revoked
+# tokens and deactivated users are dropped from it at once, but with a
+# per-process cache such as the locmem default, other worker processes
+# keep accepting them for up to TOKEN_CACHE_TIMEOUT: point CACHE_BACKEND to
+# a shared cache, or lower the timeout, when running more than one.
+TOKEN_CACHE_ALIAS = 'default'
+TOKEN_CACHE_TIMEOUT = int(os.environ.get('TOKEN_CACHE_TIMEOUT', 300))
+
+# Lifetime (seconds) of the device tokens, renewed as they are used but at
+# most once per TOKEN_RENEW_INTERVAL (seconds) to spare writes
+TOKEN_TTL = int(os.environ.get('TOKEN_TTL', 14 * 24 * 3600))
+TOKEN_RENEW_INTERVAL = int(os.environ.get('TOKEN_RENEW_INTERVAL', 24 * 3600))
+
+# Tokens issued on login: 'db' device tokens, or 'signed' tokens lasting
+# SIGNED_TOKEN_TTL seconds and verified without database lookups. Revoked
+# signed tokens are listed in the SIGNED_TOKEN_REVOCATION_CACHE_ALIAS cache,
+# which has to be shared by every process: the signed mode refuses to start
+# with a per-process one.
+AUTH_TOKEN_MODE = os.environ.get('AUTH_TOKEN_MODE', 'db')
+SIGNED_TOKEN_TTL = int(os.environ.get('SIGNED_TOKEN_TTL', 24 * 3600))
+SIGNED_TOKEN_REVOCATION_CACHE_ALIAS = 'token_revocations'
+
+# Cache alias and lifetime (seconds) of the tag, ingredient and recipe
+# responses, which are invalidated whenever their owner writes. The writes
+# only reach the processes sharing the cache: with the locmem default,
+# other worker processes serve stale responses for up to the timeout, so
+# point CACHE_BACKEND to a shared cache when running more than one.
+RECIPE_RESPONSE_CACHE_ALIAS = 'default'
+RECIPE_RESPONSE_CACHE_TIMEOUT = int(
+    os.environ.get('RECIPE_RESPONSE_CACHE_TIMEOUT', 300)
+)
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/3.1/topics/auth/passwords/
+
+# New passwords are hashed with PASSWORD_HASHER, argon2 when argon2-cffi
+# is installed. Hashes of the other hashers are still checked, and
+# rehashed on login. At most PASSWORD_HASH_CONCURRENCY hashes run at once
+# per process, the others waiting up to PASSWORD_HASH_TIMEOUT seconds.
+PASSWORD_HASHER = os.environ.get(
+    'PASSWORD_HASHER',
+    'argon2' if importlib.util.find_spec('argon2') else 'pbkdf2'
+)
+_PASSWORD_HASHERS = {
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+    'bcrypt': 'core.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'core.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHERS.items()
+    if name != PASSWORD_HASHER
+] + ['core.hashers.PBKDF2SHA1PasswordHasher']
+PASSWORD_HASH_CONCURRENCY = int(os.environ.get(
+    'PASSWORD_HASH_CONCURRENCY',
+    max(1, (os.cpu_count() or 2) // 2)
+))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+
+# Rates of logins per client IP and per account, and of signups per IP.
+# None disables a throttle
+LOGIN_RATE_PER_IP = os.environ.get('LOGIN_RATE_PER_IP', '30/min')
+LOGIN_RATE_PER_EMAIL = os.environ.get('LOGIN_RATE_PER_EMAIL', '10/min')
+SIGNUP_RATE_PER_IP = os.environ.get('SIGNUP_RATE_PER_IP', '20/hour')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -132,4 +274,73 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Uploads larger than this are streamed to a temporary file in chunks
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+
+# Limits on uploaded recipe images, which are re-encoded without
+# metadata and downscaled to RECIPE_IMAGE_MAX_DIMENSION
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = int(
+    os.environ.get('RECIPE_IMAGE_MAX_UPLOAD_SIZE', 15 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_PIXELS = 50 * 1000 * 1000
+RECIPE_IMAGE_MAX_DIMENSION = 4096
+
+# Resized variants generated for uploaded recipe images, as
+# name: (max width, max height). Variants are generated by a pool of
+# RECIPE_IMAGE_WORKERS threads, or inline with the 'sync' backend.
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': (150, 150),
+    'medium': (600, 600),
+    'large': (1200, 1200),
+}
+RECIPE_IMAGE_VARIANT_FORMAT = os.environ.get(
+    'RECIPE_IMAGE_VARIANT_FORMAT', 'WEBP'
+)
+RECIPE_IMAGE_VARIANT_QUALITY = 80
+RECIPE_IMAGE_TASK_BACKEND = os.environ.get(
+    'RECIPE_IMAGE_TASK_BACKEND', 'thread'
+)
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+
 AUTH_USER_MODEL = 'core.User'
+
+
+# Cursor pagination of the list endpoints; clients may request up to
+# API_MAX_PAGE_SIZE items per page with the page_size query parameter
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 1000))
+
+# Text search configuration used for the recipe search vectors
+RECIPE_SEARCH_CONFIG = 'english'
+
+# List recipes, tags and ingredients from values() rows instead of
+# model instances, see recipe.fast
+RECIPE_FAST_SERIALIZATION = os.environ.get(
+    'RECIPE_FAST_SERIALIZATION', '1'
+) == '1'
+
+# Recipes fetched and serialized per batch by the NDJSON export
+RECIPE_EXPORT_BATCH_SIZE = int(os.environ.get('RECIPE_EXPORT_BATCH_SIZE', 500))
+
+# Per-request instrumentation by core.middleware. Queries slower than
+# INSTRUMENTATION_SLOW_QUERY_MS are logged with the code running them,
+# and the INSTRUMENTATION_SLOW_QUERIES slowest are kept for the metrics
+# endpoint.
+INSTRUMENTATION_SERVER_TIMING = os.environ.get(
+    'INSTRUMENTATION_SERVER_TIMING', '1'
+) == '1'
+INSTRUMENTATION_SLOW_QUERY_MS = float(
+    os.environ.get('INSTRUMENTATION_SLOW_QUERY_MS', 100)
+)
+INSTRUMENTATION_SLOW_QUERIES = int(
+    os.environ.get('INSTRUMENTATION_SLOW_QUERIES', 20)
+)
+
+# Async views served by app.asgi. Reads run in a pool of
+# ASYNC_VIEWS_WORKERS threads, or in the single thread Django runs sync
+# code in when ASYNC_VIEWS_THREAD_SENSITIVE is set.
+ASYNC_VIEWS_URLCONF = 'app.asgi_urls'
+ASYNC_VIEWS_WORKERS = int(os.environ.get('ASYNC_VIEWS_WORKERS', 32))
+ASYNC_VIEWS_THREAD_SENSITIVE = os.environ.get(
+    'ASYNC_VIEWS_THREAD_SENSITIVE', '0'
+) == '1'
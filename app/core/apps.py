@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from core import signals  # noqa: F401
+        from core.authentication import check_revocation_cache
+        from core.routers import check_pin_cache
+
+        check_revocation_cache()
+        check_pin_cache()
@@ -0,0 +1,151 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler, ASGIRequest
+from django.db import close_old_connections
+from django.urls import URLPattern, URLResolver
+
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_END = object()
+
+
+def _serve(view, manage_connections, request, *args, **kwargs):
+    """Run a sync view and render its response
+
+    Threads of the pool don't get the request signals closing the
+    connections of the handler thread, so they close theirs here.
+    """
+    if manage_connections:
+        close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response = response.render()
+    finally:
+        if manage_connections:
+            close_old_connections()
+
+    return response
+
+
+def async_view(view):
+    """Return an async version of a sync view
+
+    Reads run in the pool of the event loop, so many of them are served
+    at once while clients wait on the network. Writes run in the thread
+    Django runs sync code in, as with sync views under ASGI. The view
+    authenticates the request in the same thread, so the token lookup
+    doesn't cost another switch.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in READ_METHODS:
+            thread_sensitive = settings.ASYNC_VIEWS_THREAD_SENSITIVE
+        else:
+            thread_sensitive = True
+
+        return await sync_to_async(
+            _serve,
+            thread_sensitive=thread_sensitive
+        )(view, not thread_sensitive, request, *args, **kwargs)
+
+    return wrapper
+
+
+def async_patterns(patterns, names, namespace=None):
+    """Return the URL patterns with the named views made async
+
+    Names are qualified with their namespaces, as in reverse().
+    """
+    wrapped = []
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            nested = namespace
+            if pattern.namespace:
+                nested = ':'.join(filter(None, (namespace, pattern.namespace)))
+            pattern = URLResolver(
+                pattern.pattern,
+                async_patterns(pattern.url_patterns, names, nested),
+                pattern.default_kwargs,
+                pattern.app_name,
+                pattern.namespace
+            )
+        elif pattern.name and \
+                ':'.join(filter(None, (namespace, pattern.name))) in names:
+            pattern = URLPattern(
+                pattern.pattern,
+                async_view(pattern.callback),
+                pattern.default_args,
+                pattern.name
+            )
+        wrapped.append(pattern)
+
+    return wrapped
+
+
+class AsyncViewsRequest(ASGIRequest):
+    """ASGI request routed by the URLconf with the async views"""
+
+    def __init__(self, scope, body_file):
+        super().__init__(scope, body_file)
+        self.urlconf = settings.ASYNC_VIEWS_URLCONF
+
+
+class AsyncViewsASGIHandler(ASGIHandler):
+    """ASGI handler serving the async views
+
+    The pool of the event loop running the handler is sized by
+    ASYNC_VIEWS_WORKERS.
+    """
+    request_class = AsyncViewsRequest
+
+    def __init__(self):
+        super().__init__()
+        self._loop = None
+
+    async def __call__(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            loop.set_default_executor(ThreadPoolExecutor(
+                settings.ASYNC_VIEWS_WORKERS,
+                thread_name_prefix='async-views'
+            ))
+        await super().__call__(scope, receive, send)
+
+    async def send_response(self, response, send):
+        """Send a response, producing streamed content out of the loop
+
+        Streamed content may query the database as it is produced, which
+        Django doesn't allow on the event loop. Its parts are produced in
+        the thread the sync views run in, then sent before the closing
+        message the handler sends after the (emptied) stream.
+        """
+        if not response.streaming:
+            return await super().send_response(response, send)
+        parts = iter(response)
+        response.streaming_content = ()
+        next_part = sync_to_async(next, thread_sensitive=True)
+
+        async def send_parts(message):
+            if message['type'] == 'http.response.body' and \
+                    not message.get('more_body'):
+                while True:
+                    part = await next_part(parts, _END)
+                    if part is _END:
+                        break
+                    for chunk, _ in self.chunk_bytes(part):
+                        await send({
+                            'type': 'http.response.body',
+                            'body': chunk,
+                            'more_body': True,
+                        })
+            await send(message)
+
+        await super().send_response(response, send_parts)
@@ -0,0 +1,191 @@
+import secrets
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, \
+                                          TokenAuthentication, \
+                                          get_authorization_header
+
+from core.checks import check_shared_cache
+from core.models import DeviceToken
+
+
+SIGNED_TOKEN_SALT = 'core.authentication.signed-token'
+
+
+def token_cache_key(key):
+    """Return the cache key holding the token with the given key"""
+    return f'auth-token:{key}'
+
+
+def invalidate_token(key):
+    """Remove a token from the authentication cache"""
+    caches[settings.TOKEN_CACHE_ALIAS].delete(token_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Device token authentication that caches tokens with their users
+
+    Expired tokens are rejected, the others are renewed for TOKEN_TTL
+    once TOKEN_RENEW_INTERVAL went by since they were last renewed.
+
+    Deleted tokens and saved users are dropped from the cache right away,
+    but only from the processes sharing it: with a per-process cache such
+    as locmem, the other processes keep accepting a deleted token, or a
+    deactivated user, for up to TOKEN_CACHE_TIMEOUT.
+    """
+    model = DeviceToken
+
+    def authenticate_credentials(self, key):
+        """Return the user and token, from the cache when possible"""
+        cache = caches[settings.TOKEN_CACHE_ALIAS]
+        cache_key = token_cache_key(key)
+        token = cache.get(cache_key)
+        now = timezone.now()
+        # A cached copy may have been renewed since
+        cached = token is not None and token.expires > now
+        if not cached:
+            user, token = super().authenticate_credentials(key)
+            if token.expires <= now:
+                raise exceptions.AuthenticationFailed(_('Token has expired.'))
+
+        ttl = timedelta(seconds=settings.TOKEN_TTL)
+        renewed_before = now + ttl - timedelta(
+            seconds=settings.TOKEN_RENEW_INTERVAL
+        )
+        if token.expires <= renewed_before:
+            token.expires = now + ttl
+            self.model.objects.filter(pk=key).update(expires=token.expires)
+            cached = False
+        if not cached:
+            cache.set(cache_key, token, settings.TOKEN_CACHE_TIMEOUT)
+
+        return (token.user, token)
+
+
+def sign_token(user):
+    """Return a signed token for the user and its expiry date"""
+    token = signing.dumps(
+        {'u': user.pk, 'j': secrets.token_hex(8), 'i': time.time()},
+        salt=SIGNED_TOKEN_SALT
+    )
+
+    expires = timezone.now() + timedelta(seconds=settings.SIGNED_TOKEN_TTL)
+
+    return token, expires
+
+
+def _revocations():
+    return caches[settings.SIGNED_TOKEN_REVOCATION_CACHE_ALIAS]
+
+
+def check_revocation_cache():
+    """Refuse signed tokens whose revocations would not reach every process"""
+    if settings.AUTH_TOKEN_MODE != 'signed':
+        return
+    check_shared_cache(settings.SIGNED_TOKEN_REVOCATION_CACHE_ALIAS,
+                       'Signed tokens')
+
+
+def _revoked_token_key(token_id):
+    return f'signed-token-revoked:{token_id}'
+
+
+def _revoked_user_key(user_id):
+    return f'signed-token-revoked-user:{user_id}'
+
+
+def verify_signed_token(token):
+    """Return the payload of a signed token, if valid and not revoked"""
+    try:
+        payload = signing.loads(token, salt=SIGNED_TOKEN_SALT,
+                                max_age=settings.SIGNED_TOKEN_TTL)
+    except signing.SignatureExpired:
+        raise exceptions.AuthenticationFailed(_('Token has expired.'))
+    except signing.BadSignature:
+        raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+    token_key = _revoked_token_key(payload['j'])
+    user_key = _revoked_user_key(payload['u'])
+    revoked = _revocations().get_many([token_key, user_key])
+    if token_key in revoked or payload['i'] <= revoked.get(user_key, 0):
+        raise exceptions.AuthenticationFailed(_('Token has been revoked.'))
+
+    return payload
+
+
+def revoke_signed_token(token):
+    """Reject a signed token until it expires"""
+    payload = verify_signed_token(token)
+    _revocations().set(
+        _revoked_token_key(payload['j']),
+        True,
+        settings.SIGNED_TOKEN_TTL
+    )
+
+
+def revoke_user_signed_tokens(user_id):
+    """Reject the signed tokens issued to the user so far"""
+    _revocations().set(
+        _revoked_user_key(user_id),
+        time.time(),
+        settings.SIGNED_TOKEN_TTL
+    )
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Signed token authentication that never queries the database
+
+    The user is only known by its id, which is all the recipe views need.
+    Tokens without a signature, such as device token keys, and any token
+    outside of the signed AUTH_TOKEN_MODE are left to the next
+    authentication class.
+    """
+    keyword = 'Token'
+    # Whether to load the user, for views needing more than its id
+    load_user = False
+
+    def authenticate(self, request):
+        if settings.AUTH_TOKEN_MODE != 'signed':
+            return None
+        auth = get_authorization_header(request).split()
+        if len(auth) != 2 or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            return None
+        # Signed values hold their timestamp and signature after colons
+        if ':' not in token:
+            return None
+        payload = verify_signed_token(token)
+
+        return (self.get_user(payload['u']), token)
+
+    def get_user(self, user_id):
+        """Return the user the token was signed for"""
+        User = get_user_model()
+        if not self.load_user:
+            user = User(pk=user_id, is_active=True)
+            user._state.adding = False
+            return user
+        try:
+            return User.objects.get(pk=user_id, is_active=True)
+        except User.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+class SignedTokenUserAuthentication(SignedTokenAuthentication):
+    """Signed token authentication loading the user"""
+    load_user = True
@@ -0,0 +1,169 @@
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """No connection of a pool got free in time"""
+
+
+class ConnectionPool:
+    """Thread safe pool of up to max_size database connections
+
+    Connections idle for check_after seconds or more are health checked
+    when checked out, and replaced when the check fails.
+    """
+
+    def __init__(self, max_size, timeout, check=None, check_after=0,
+                 close=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check = check
+        self.check_after = check_after
+        self._close = close or (lambda conn: conn.close())
+        self._idle = []
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._counters = {
+            'checkouts': 0,
+            'connects': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'failed_checks': 0,
+        }
+        self._wait_ms = 0.0
+        self._max_wait_ms = 0.0
+
+    def _discard(self, conn):
+        """Close a connection, ignoring its errors"""
+        try:
+            self._close(conn)
+        except Exception:
+            pass
+
+    def acquire(self, connect):
+        """Check out a connection, calling connect to open a new one
+
+        Waits up to timeout seconds for one to be released when the pool
+        is full, raising PoolTimeout otherwise.
+        """
+        start = time.perf_counter()
+        conn = None
+        with self._condition:
+            while True:
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = start + self.timeout - time.perf_counter()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise PoolTimeout(
+                        f'No database connection free after {self.timeout}s'
+                    )
+                self._condition.wait(remaining)
+            wait_ms = (time.perf_counter() - start) * 1000
+            self._counters['checkouts'] += 1
+            self._counters['waits'] += wait_ms > 1
+            self._wait_ms += wait_ms
+            self._max_wait_ms = max(self._max_wait_ms, wait_ms)
+
+        if conn is not None and self.check and \
+                time.monotonic() - released_at >= self.check_after and \
+                not self.check(conn):
+            self._discard(conn)
+            conn = None
+            with self._condition:
+                self._counters['failed_checks'] += 1
+        if conn is None:
+            # The slot is taken, give it back if connecting fails
+            try:
+                conn = connect()
+            except BaseException:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._counters['connects'] += 1
+
+        return conn
+
+    def release(self, conn, discard=False):
+        """Return a checked out connection, closing it when discarded"""
+        with self._condition:
+            if discard or self._closed:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+        if discard or self._closed:
+            self._discard(conn)
+
+    def close(self):
+        """Close the idle connections, and the others once released"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        """Return the size, usage and wait times of the pool"""
+        with self._condition:
+            checkouts = self._counters['checkouts']
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                **self._counters,
+                'mean_wait_ms': self._wait_ms / checkouts if checkouts else 0,
+                'max_wait_ms': self._max_wait_ms,
+            }
+
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def get_pool(alias, key, factory):
+    """Return the pool of the alias for the key, creating it if needed
+
+    The key identifies the server and database connected to. Pools of
+    the alias for other keys are closed, as its settings changed, e.g.
+    when tests switch to the test database.
+    """
+    with _lock:
+        pool = _pools.get((alias, key))
+        if pool is not None:
+            return pool
+        stale = [
+            _pools.pop(other) for other in list(_pools)
+            if other[0] == alias
+        ]
+        pool = _pools[(alias, key)] = factory()
+    for other in stale:
+        other.close()
+
+    return pool
+
+
+def close_pools(alias=None):
+    """Close the pools of the alias, or all of them"""
+    with _lock:
+        keys = [key for key in _pools if alias in (None, key[0])]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        pool.close()
+
+
+def stats():
+    """Return the stats of the pools, by database alias"""
+    with _lock:
+        pools = [(alias, pool) for (alias, _), pool in _pools.items()]
+
+    return {alias: pool.stats() for alias, pool in pools}
@@ -0,0 +1,99 @@
+"""PostgreSQL backend checking connections out of an in-process pool
+
+Closing a connection returns it to the pool of its database, shared by
+the threads of the process, which is sized by the POOL settings of the
+database:
+
+    'POOL': {
+        'MAX_SIZE': 10,     # Connections per process
+        'TIMEOUT': 10,      # Seconds to wait for a free connection
+        'CHECK_AFTER': 5,   # Idle seconds before a checkout health check
+    }
+"""
+import psycopg2
+from psycopg2 import extensions
+
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import \
+    DatabaseCreation as BaseDatabaseCreation
+from django.utils.asyncio import async_unsafe
+
+from core import instrumentation
+from core.backends import pool
+
+
+def is_usable(connection):
+    """Return whether a psycopg2 connection still works"""
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except psycopg2.Error:
+        return False
+
+    return True
+
+
+class DatabaseCreation(BaseDatabaseCreation):
+    """Close the pooled connections before dropping or cloning test DBs"""
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        pool.close_pools(self.connection.alias)
+        super()._clone_test_db(suffix, verbosity, keepdb)
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        pool.close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def _get_pool(self, conn_params):
+        options = self.settings_dict.get('POOL', {})
+
+        return pool.get_pool(
+            self.alias,
+            repr(sorted(conn_params.items())),
+            lambda: pool.ConnectionPool(
+                options.get('MAX_SIZE', 10),
+                options.get('TIMEOUT', 10),
+                check=is_usable,
+                check_after=options.get('CHECK_AFTER', 5)
+            )
+        )
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        self._pool = self._get_pool(conn_params)
+        with instrumentation.span('db_pool'):
+            try:
+                connection = self._pool.acquire(
+                    lambda: super(DatabaseWrapper, self).get_new_connection(
+                        conn_params
+                    )
+                )
+            except pool.PoolTimeout as e:
+                raise psycopg2.OperationalError(str(e)) from e
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level',
+            connection.isolation_level
+        )
+
+        return connection
+
+    def _close(self):
+        """Return the connection to its pool, out of any transaction"""
+        if self.connection is None:
+            return
+        connection = self.connection
+        status = connection.get_transaction_status() \
+            if not connection.closed else extensions.TRANSACTION_STATUS_UNKNOWN
+        discard = status == extensions.TRANSACTION_STATUS_UNKNOWN
+        if not discard and status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                discard = True
+        self._pool.release(connection, discard=discard)
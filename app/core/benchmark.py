@@ -0,0 +1,488 @@
+import asyncio
+import json
+import random
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from io import BytesIO
+from urllib.parse import urlsplit
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, \
+                                  make_server
+
+from asgiref.sync import sync_to_async
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, \
+                               encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import bulk
+from core.async_views import AsyncViewsASGIHandler
+from core.models import DeviceToken, Tag, Ingredient, Recipe
+
+
+PASSWORD = 'benchmark-password'
+# Settings disabling the login and signup throttles, so that benchmarks
+# time the requests rather than their rejection
+UNTHROTTLED = {
+    'LOGIN_RATE_PER_IP': None,
+    'LOGIN_RATE_PER_EMAIL': None,
+    'SIGNUP_RATE_PER_IP': None,
+}
+
+
+class Dataset:
+    """Synthetic users with their recipes, tags and ingredients"""
+
+    def __init__(self, users, recipes, tags, ingredients, seed=0):
+        self.sizes = (users, recipes, tags, ingredients)
+        self.random = random.Random(seed)
+        self.prefix = f'benchmark-{uuid.uuid4().hex[:8]}-'
+        self.users = []
+        self.image = sample_image()
+
+    def sample(self, ids, count):
+        """Return up to count random ids"""
+        return self.random.sample(ids, min(count, len(ids)))
+
+    def seed(self):
+        """Create the users, with a token, and their objects"""
+        users, recipes, tags, ingredients = self.sizes
+        for i in range(users):
+            user = get_user_model().objects.create_user(
+                f'{self.prefix}{i}@example.com',
+                PASSWORD
+            )
+            token = DeviceToken.objects.issue(user)
+            tag_ids = [tag.pk for tag in bulk.insert(Tag, [
+                Tag(user=user, name=f'Tag {n}') for n in range(tags)
+            ])]
+            ingredient_ids = [obj.pk for obj in bulk.insert(Ingredient, [
+                Ingredient(user=user, name=f'Ingredient {n}')
+                for n in range(ingredients)
+            ])]
+            recipe_ids = [recipe.pk for recipe in bulk.create_objects(
+                Recipe,
+                [{
+                    'user': user,
+                    'title': f'Recipe {n}',
+                    'time_minutes': self.random.randint(5, 120),
+                    'price': self.random.randint(100, 5000) / 100,
+                    'tags': self.sample(tag_ids, 3),
+                    'ingredients': self.sample(ingredient_ids, 5),
+                } for n in range(recipes)],
+                batch_size=500
+            )]
+            self.users.append({
+                'id': user.pk,
+                'email': user.email,
+                'token': token.key,
+                'tags': tag_ids,
+                'ingredients': ingredient_ids,
+                'recipes': recipe_ids,
+            })
+
+    def pick_user(self):
+        """Return a random seeded user"""
+        return self.random.choice(self.users)
+
+    def cleanup(self):
+        """Delete the seeded users with everything they own"""
+        from recipe import images
+
+        images.wait_for_variants()
+        recipes = Recipe.objects.filter(
+            user__email__startswith=self.prefix
+        ).exclude(image='').exclude(image=None)
+        for recipe in recipes.only('image'):
+            images.delete_image(recipe.image)
+        get_user_model().objects.filter(
+            email__startswith=self.prefix
+        ).delete()
+
+
+def sample_image():
+    """Return a small JPEG to upload"""
+    buffer = BytesIO()
+    Image.new('RGB', (640, 480), (200, 120, 40)).save(buffer, 'JPEG')
+
+    return buffer.getvalue()
+
+
+class TestClientTransport:
+    """Send the requests through the Django test client, in process"""
+    name = 'client'
+    counts_queries = True
+
+    def __init__(self):
+        self.client = APIClient()
+
+    def request(self, method, path, body=b'', content_type=None,
+                token=None):
+        """Send a request, returning its status, seconds and queries"""
+        extra = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = self.client.generic(
+                method, path, body,
+                content_type or 'application/octet-stream',
+                **extra
+            )
+            elapsed = time.perf_counter() - start
+
+        return response.status_code, elapsed, len(queries)
+
+    def close(self):
+        pass
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class WSGIServerTransport:
+    """Send the requests over HTTP to a local WSGI server thread
+
+    Queries run in the server thread, so they aren't counted.
+    """
+    name = 'wsgi'
+    counts_queries = False
+
+    def __init__(self):
+        self.server = make_server(
+            '127.0.0.1', 0, get_wsgi_application(),
+            server_class=WSGIServer,
+            handler_class=_QuietRequestHandler
+        )
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            daemon=True
+        )
+        self.thread.start()
+        self.connection = HTTPConnection(*self.server.server_address)
+
+    def request(self, method, path, body=b'', content_type=None,
+                token=None):
+        """Send a request, returning its status, seconds and queries"""
+        headers = {}
+        if token:
+            headers['Authorization'] = f'Token {token}'
+        if content_type:
+            headers['Content-Type'] = content_type
+        start = time.perf_counter()
+        self.connection.request(method, path, body or None, headers)
+        response = self.connection.getresponse()
+        response.read()
+        elapsed = time.perf_counter() - start
+        # wsgiref closes the connection after each response
+        self.connection.close()
+
+        return response.status, elapsed, None
+
+    def close(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _json(data):
+    return json.dumps(data).encode(), 'application/json'
+
+
+def _multipart(data):
+    return encode_multipart(BOUNDARY, data), MULTIPART_CONTENT
+
+
+def login(dataset, user):
+    # Logins rotate the token of their device, not the seeded one
+    body, content_type = _json({
+        'email': user['email'],
+        'password': PASSWORD,
+        'device': 'benchmark-login',
+    })
+    return 'POST', reverse('user:token'), body, content_type, None
+
+
+def recipe_list(dataset, user):
+    return 'GET', reverse('recipe:recipe-list'), b'', None, user['token']
+
+
+def recipe_list_filtered(dataset, user):
+    params = {
+        'tags': dataset.sample(user['tags'], 2),
+        'ingredients': dataset.sample(user['ingredients'], 1),
+    }
+    path = reverse('recipe:recipe-list') + '?' + '&'.join(
+        f'{key}={"|".join(str(pk) for pk in ids)}'
+        for key, ids in params.items() if ids
+    )
+
+    return 'GET', path, b'', None, user['token']
+
+
+def recipe_detail(dataset, user):
+    recipe_id = dataset.random.choice(user['recipes'])
+    path = reverse('recipe:recipe-detail', args=[recipe_id])
+
+    return 'GET', path, b'', None, user['token']
+
+
+def recipe_create(dataset, user):
+    body, content_type = _json({
+        'title': 'Benchmark recipe',
+        'time_minutes': 10,
+        'price': '5.00',
+        'tags': dataset.sample(user['tags'], 3),
+        'ingredients': dataset.sample(user['ingredients'], 5),
+    })
+
+    return 'POST', reverse('recipe:recipe-list'), body, content_type, \
+        user['token']
+
+
+def image_upload(dataset, user):
+    recipe_id = dataset.random.choice(user['recipes'])
+    image = BytesIO(dataset.image)
+    image.name = 'benchmark.jpg'
+    body, content_type = _multipart({'image': image})
+    path = reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+    return 'POST', path, body, content_type, user['token']
+
+
+# Builders of the request of each scenario, with its expected status
+SCENARIOS = {
+    'login': (login, 200),
+    'recipe_list': (recipe_list, 200),
+    'recipe_list_filtered': (recipe_list_filtered, 200),
+    'recipe_detail': (recipe_detail, 200),
+    'recipe_create': (recipe_create, 201),
+    'image_upload': (image_upload, 200),
+}
+
+
+def percentile(timings, percent):
+    """Return the percentile of the sorted timings, by nearest rank"""
+    rank = max(1, -(-len(timings) * percent // 100))
+
+    return timings[int(rank) - 1]
+
+
+def _summary(timings, errors, total):
+    """Return the statistics of the timings, in ms, of a run"""
+    timings = sorted(timings)
+
+    return {
+        'requests': len(timings),
+        'errors': errors,
+        'p50': percentile(timings, 50),
+        'p95': percentile(timings, 95),
+        'p99': percentile(timings, 99),
+        'rps': len(timings) / total if total else None,
+    }
+
+
+def run_scenario(transport, dataset, name, requests, warmup=0,
+                 before_request=None):
+    """Time the requests of a scenario, returning its statistics"""
+    build, expected_status = SCENARIOS[name]
+    timings = []
+    queries = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(warmup + requests):
+        user = dataset.pick_user()
+        if before_request:
+            before_request(user)
+        status, elapsed, query_count = transport.request(
+            *build(dataset, user)
+        )
+        if i < warmup:
+            started = time.perf_counter()
+            continue
+        timings.append(elapsed * 1000)
+        queries.append(query_count)
+        errors += status != expected_status
+    result = _summary(timings, errors, time.perf_counter() - started)
+    result['queries'] = statistics.mean(queries) \
+        if transport.counts_queries else None
+
+    return result
+
+
+def build_requests(dataset, names, count):
+    """Return count requests cycling through the scenarios
+
+    Each is a tuple of the user, the request and its expected status.
+    """
+    requests = []
+    for i in range(count):
+        build, expected_status = SCENARIOS[names[i % len(names)]]
+        user = dataset.pick_user()
+        requests.append((user, build(dataset, user), expected_status))
+
+    return requests
+
+
+def run_wsgi(requests, workers, client_delay, before_request=None):
+    """Serve the requests concurrently with a pool of WSGI workers
+
+    Like a thread-per-request server, a worker is held while its client
+    takes client_delay seconds to send the request.
+    """
+    application = get_wsgi_application()
+
+    def serve(user, request, expected_status):
+        method, path, body, content_type, token = request
+        url = urlsplit(path)
+        start = time.perf_counter()
+        if before_request:
+            before_request(user)
+        time.sleep(client_delay)
+        environ = {
+            'REQUEST_METHOD': method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': url.path,
+            'QUERY_STRING': url.query,
+            'SERVER_NAME': '127.0.0.1',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': BytesIO(body),
+            'wsgi.url_scheme': 'http',
+            'wsgi.errors': BytesIO(),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        if content_type:
+            environ['CONTENT_TYPE'] = content_type
+        if token:
+            environ['HTTP_AUTHORIZATION'] = f'Token {token}'
+        statuses = []
+        response = application(
+            environ,
+            lambda status, headers: statuses.append(int(status[:3]))
+        )
+        try:
+            b''.join(response)
+        finally:
+            response.close()
+
+        return time.perf_counter() - start, statuses[0] != expected_status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as executor:
+        results = list(executor.map(lambda args: serve(*args), requests))
+    total = time.perf_counter() - started
+
+    return _summary(
+        [elapsed * 1000 for elapsed, _ in results],
+        sum(error for _, error in results),
+        total
+    )
+
+
+def run_asgi(requests, concurrency, client_delay, before_request=None):
+    """Serve the requests with concurrent clients on one ASGI event loop
+
+    Clients take client_delay seconds to send their requests, without
+    holding any thread meanwhile.
+    """
+    application = AsyncViewsASGIHandler()
+
+    async def serve(user, request, expected_status):
+        method, path, body, content_type, token = request
+        url = urlsplit(path)
+        headers = [(b'host', b'127.0.0.1')]
+        if content_type:
+            headers.append((b'content-type', content_type.encode()))
+        if token:
+            headers.append((b'authorization', f'Token {token}'.encode()))
+        statuses = []
+
+        async def receive():
+            await asyncio.sleep(client_delay)
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        start = time.perf_counter()
+        if before_request:
+            await sync_to_async(before_request)(user)
+        await application({
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': url.path,
+            'raw_path': url.path.encode(),
+            'query_string': url.query.encode(),
+            'root_path': '',
+            'headers': headers,
+            'client': ('127.0.0.1', 0),
+            'server': ('127.0.0.1', 80),
+        }, receive, send)
+
+        return time.perf_counter() - start, statuses[0] != expected_status
+
+    async def run():
+        pending = iter(requests)
+        results = []
+
+        async def client():
+            for args in pending:
+                results.append(await serve(*args))
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+        return results
+
+    started = time.perf_counter()
+    results = asyncio.run(run())
+    total = time.perf_counter() - started
+
+    return _summary(
+        [elapsed * 1000 for elapsed, _ in results],
+        sum(error for _, error in results),
+        total
+    )
+
+
+def compare(results, baseline, tolerance):
+    """Return the regressions of the results against a baseline
+
+    A scenario regresses when its p95 latency grows by more than the
+    tolerance, a fraction, or when it runs more queries per request.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result['p95'] > base['p95'] * (1 + tolerance):
+            regressions.append(
+                f'{name}: p95 {result["p95"]:.2f}ms, '
+                f'baseline {base["p95"]:.2f}ms'
+            )
+        if None not in (result['queries'], base.get('queries')) and \
+                result['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: {result["queries"]:.1f} queries per request, '
+                f'baseline {base["queries"]:.1f}'
+            )
+
+    return regressions
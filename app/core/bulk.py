@@ -0,0 +1,119 @@
+from collections import Counter
+
+from django.db import connections, router
+
+from core.filters import link_columns
+from core.signals import bulk_written
+
+
+def insert(model, objs, batch_size=None):
+    """Insert the objects with bulk queries, setting their primary keys"""
+    connection = connections[router.db_for_write(model)]
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs, batch_size=batch_size)
+
+    # Without RETURNING support bulk_create can't set the primary keys
+    # the M2M links need, so fall back to one insert per object
+    for obj in objs:
+        obj.save(force_insert=True)
+
+    return objs
+
+
+def set_links(objs, links, batch_size=None, replace=False):
+    """Write the M2M links of each object with one insert per relation
+
+    links holds a dict per object mapping M2M field names to the related
+    objects or primary keys. With replace the existing links of the
+    relations given are deleted first. Returns, by M2M field name, the
+    change in the number of links of each related object relinked.
+    """
+    relinked = {}
+    if not objs:
+        return relinked
+    model = type(objs[0])
+    for field in model._meta.many_to_many:
+        through, source, target = link_columns(field)
+        rows = []
+        linked_ids = []
+        for obj, obj_links in zip(objs, links):
+            if field.name not in obj_links:
+                continue
+            linked_ids.append(obj.pk)
+            related_ids = dict.fromkeys(
+                getattr(related, 'pk', related)
+                for related in obj_links[field.name]
+            )
+            rows.extend(
+                through(**{source: obj.pk, target: related_id})
+                for related_id in related_ids
+            )
+        if not linked_ids:
+            continue
+        changed = Counter(getattr(row, target) for row in rows)
+        if replace:
+            old_links = through.objects.filter(
+                **{f'{source}__in': linked_ids}
+            )
+            changed.subtract(old_links.values_list(target, flat=True))
+            old_links.delete()
+        through.objects.bulk_create(rows, batch_size=batch_size)
+        relinked[field.name] = changed
+
+    return relinked
+
+
+def _split_links(model, rows):
+    """Separate the M2M values from the field values of each row"""
+    names = {field.name for field in model._meta.many_to_many}
+    values = []
+    links = []
+    for row in rows:
+        values.append(
+            {key: value for key, value in row.items() if key not in names}
+        )
+        links.append(
+            {key: value for key, value in row.items() if key in names}
+        )
+
+    return values, links
+
+
+def create_objects(model, rows, batch_size=None):
+    """Create objects and their M2M links from dicts of field values"""
+    values, links = _split_links(model, rows)
+    objs = insert(model, [model(**row) for row in values], batch_size)
+    relinked = set_links(objs, links, batch_size)
+    bulk_written.send(sender=model, objs=objs, relinked=relinked)
+
+    return objs
+
+
+def update_objects(objs, rows, batch_size=None):
+    """Apply dicts of field values to the objects with bulk queries"""
+    if not objs:
+        return objs
+    model = type(objs[0])
+    values, links = _split_links(model, rows)
+    fields = set()
+    for obj, row in zip(objs, values):
+        for key, value in row.items():
+            setattr(obj, key, value)
+        fields.update(row)
+    # bulk_update skips pre_save, which sets the auto_now fields
+    auto_now = [field for field in model._meta.concrete_fields
+                if getattr(field, 'auto_now', False)]
+    for field in auto_now:
+        for obj in objs:
+            field.pre_save(obj, add=False)
+        fields.add(field.name)
+    if fields:
+        model.objects.bulk_update(
+            objs,
+            sorted(fields),
+            batch_size=batch_size
+        )
+    relinked = set_links(objs, links, batch_size, replace=True)
+    bulk_written.send(sender=model, objs=objs, relinked=relinked)
+
+    return objs
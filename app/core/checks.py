@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+def check_shared_cache(alias, feature):
+    """Refuse a cache whose entries would not reach every process"""
+    backend = settings.CACHES[alias]['BACKEND']
+    if issubclass(import_string(backend), (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            f'{feature} need the {alias} cache to be shared by every '
+            f'process, {backend} is not'
+        )
@@ -0,0 +1,97 @@
+import contextvars
+from contextlib import contextmanager
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.filters import link_columns
+from core.models import Recipe
+
+
+_deleting = contextvars.ContextVar('counters_deleting', default=False)
+
+
+def adjust(model, deltas):
+    """Add the deltas to the recipe counts of the objects, by object id
+
+    The objects are touched too, as the count is part of their
+    representation. One UPDATE is run per distinct delta.
+    """
+    ids_by_delta = {}
+    for pk, delta in deltas.items():
+        ids_by_delta.setdefault(delta, []).append(pk)
+    now = timezone.now()
+    for delta, ids in ids_by_delta.items():
+        model.objects.filter(pk__in=ids).update(
+            recipe_count=F('recipe_count') + delta,
+            updated_at=now
+        )
+
+
+def uncount(recipe_ids):
+    """Decrement the counts of the tags/ingredients of the recipes
+
+    The recipe ids may be a subquery. One UPDATE is run per relation,
+    whatever the number of recipes.
+    """
+    now = timezone.now()
+    for field in Recipe._meta.many_to_many:
+        through, source, target = link_columns(field)
+        links = through.objects.filter(**{f'{source}__in': recipe_ids})
+        counts = links.filter(**{target: OuterRef('pk')}).order_by() \
+            .values(target).annotate(count=Count('pk'))
+        field.related_model.objects.filter(
+            pk__in=links.values(target)
+        ).update(
+            recipe_count=F('recipe_count') - Subquery(counts.values('count')),
+            updated_at=now
+        )
+
+
+@contextmanager
+def deleting():
+    """Skip the per object updates of the deletions in the block
+
+    Neither the counts of the relations of deleted recipes are adjusted
+    nor the recipes losing a deleted tag/ingredient touched. For
+    deletions adjusting the counts in bulk, or deleting every object of
+    a user.
+    """
+    token = _deleting.set(True)
+    try:
+        yield
+    finally:
+        _deleting.reset(token)
+
+
+def is_deleting():
+    """Return whether the counts are adjusted apart from the deletions"""
+    return _deleting.get()
+
+
+def delete_recipes(queryset):
+    """Delete the recipes, adjusting the counts in bulk"""
+    uncount(queryset.values('pk'))
+    with deleting():
+        return queryset.delete()
+
+
+def recount():
+    """Recompute the wrong recipe counts of the tags and ingredients
+
+    Returns the number of objects repaired, by model.
+    """
+    repaired = {}
+    for field in Recipe._meta.many_to_many:
+        through, _, target = link_columns(field)
+        counts = through.objects.filter(**{target: OuterRef('pk')}) \
+            .order_by().values(target).annotate(count=Count('pk'))
+        count = Coalesce(Subquery(counts.values('count')), 0)
+        model = field.related_model
+        repaired[model] = model.objects.exclude(recipe_count=count).update(
+            recipe_count=count,
+            updated_at=timezone.now()
+        )
+
+    return repaired
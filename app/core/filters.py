@@ -0,0 +1,51 @@
+from django.db.models import Count, Exists, OuterRef
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_MODES = (MATCH_ANY, MATCH_ALL)
+
+
+def link_columns(field):
+    """Return the M2M table of the field and its id columns
+
+    The source column points to the model declaring the field, the target
+    one to the related model.
+    """
+    through = field.remote_field.through
+    source = through._meta.get_field(field.m2m_field_name()).attname
+    target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+
+    return through, source, target
+
+
+def filter_by_related(queryset, field_name, ids, match=MATCH_ANY):
+    """Filter the objects linked to any, or all, of the related ids
+
+    Links are looked up in subqueries on the M2M table instead of joins,
+    so objects linked to several of the ids are returned once without a
+    DISTINCT over the joined rows.
+    """
+    through, source, target = link_columns(
+        queryset.model._meta.get_field(field_name)
+    )
+    ids = set(ids)
+    links = through.objects.filter(**{f'{target}__in': ids})
+
+    if match == MATCH_ALL:
+        # Links are unique, so linked to all of them means one link per id
+        return queryset.filter(pk__in=links.order_by().values(source)
+                               .annotate(matches=Count(target))
+                               .filter(matches=len(ids))
+                               .values(source))
+
+    return queryset.filter(Exists(links.filter(**{source: OuterRef('pk')})))
+
+
+def filter_linked(queryset, field):
+    """Filter the related objects of the M2M field linked at least once"""
+    through, _, target = link_columns(field)
+
+    return queryset.filter(
+        Exists(through.objects.filter(**{target: OuterRef('pk')}))
+    )
@@ -0,0 +1,87 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingUnavailable(APIException):
+    """Every password hashing slot stayed busy for too long"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many password checks at once, try again.')
+    default_code = 'hashing_unavailable'
+
+
+_slots = None
+_slots_lock = threading.Lock()
+_local = threading.local()
+
+
+def _semaphore():
+    """Return the semaphore of the PASSWORD_HASH_CONCURRENCY slots"""
+    global _slots
+    size = settings.PASSWORD_HASH_CONCURRENCY
+    with _slots_lock:
+        if _slots is None or _slots[0] != size:
+            _slots = (size, threading.BoundedSemaphore(size))
+
+        return _slots[1]
+
+
+@contextmanager
+def hashing_slot():
+    """Hold a password hashing slot while hashing
+
+    Bounds the cores pinned by hashing, so other requests keep being
+    served. Waits up to PASSWORD_HASH_TIMEOUT seconds for a slot,
+    raising HashingUnavailable otherwise. Nested hashing, as when a
+    hasher verifies by encoding, reuses the slot of the thread.
+    """
+    if getattr(_local, 'holding', False):
+        yield
+        return
+    semaphore = _semaphore()
+    if not semaphore.acquire(timeout=settings.PASSWORD_HASH_TIMEOUT):
+        raise HashingUnavailable()
+    _local.holding = True
+    try:
+        yield
+    finally:
+        _local.holding = False
+        semaphore.release()
+
+
+class BoundedHasherMixin:
+    """Hash passwords within a hashing slot"""
+
+    def encode(self, *args, **kwargs):
+        with hashing_slot():
+            return super().encode(*args, **kwargs)
+
+    def verify(self, *args, **kwargs):
+        with hashing_slot():
+            return super().verify(*args, **kwargs)
+
+
+class Argon2PasswordHasher(BoundedHasherMixin,
+                           hashers.Argon2PasswordHasher):
+    pass
+
+
+class BCryptSHA256PasswordHasher(BoundedHasherMixin,
+                                 hashers.BCryptSHA256PasswordHasher):
+    pass
+
+
+class PBKDF2PasswordHasher(BoundedHasherMixin,
+                           hashers.PBKDF2PasswordHasher):
+    pass
+
+
+class PBKDF2SHA1PasswordHasher(BoundedHasherMixin,
+                               hashers.PBKDF2SHA1PasswordHasher):
+    pass
@@ -0,0 +1,221 @@
+import bisect
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in ms of the latency histogram buckets, plus an overflow
+BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+_lock = threading.Lock()
+_routes = {}
+_slow_queries = []
+_sequence = itertools.count()
+_skipped_files = (__file__, os.path.join('core', 'middleware.py'),
+                  os.path.join('core', 'async_views.py'))
+
+
+class RequestMetrics:
+    """Timings and queries of the request being served"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.spans = {}
+        self.open_spans = set()
+        self.slow_queries = []
+
+    def record_query(self, sql, duration):
+        """Count a query, keeping its origin when it is slow"""
+        self.queries += 1
+        self.db_time += duration
+        if duration * 1000 >= settings.INSTRUMENTATION_SLOW_QUERY_MS:
+            self.slow_queries.append((duration, sql, query_origin()))
+
+
+def execute(execute, sql, params, many, context):
+    """Connection execute wrapper timing the queries of requests
+
+    It is installed on every connection, so queries run by a request in
+    other threads, as async views do, are timed too.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - start)
+
+
+def query_origin():
+    """Return the innermost project frame on the stack, as file:line"""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if not filename.startswith(base_dir) or \
+                'site-packages' in filename or \
+                filename.endswith(_skipped_files):
+            continue
+        path = os.path.relpath(filename, base_dir)
+        return f'{path}:{frame.lineno} in {frame.name}'
+
+    return None
+
+
+def start_request():
+    """Start collecting the metrics of a request, returning a token"""
+    return _current.set(RequestMetrics())
+
+
+def end_request(token):
+    """Stop collecting metrics, returning those of the request"""
+    metrics = _current.get()
+    _current.reset(token)
+
+    return metrics
+
+
+def current():
+    """Return the metrics of the request being served, if any"""
+    return _current.get()
+
+
+@contextmanager
+def span(name):
+    """Add the time spent in the block to the named span of the request
+
+    Nested spans of the same name are only timed once.
+    """
+    metrics = _current.get()
+    if metrics is None or name in metrics.open_spans:
+        yield
+        return
+    metrics.open_spans.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.open_spans.discard(name)
+        metrics.spans[name] = metrics.spans.get(name, 0) + \
+            time.perf_counter() - start
+
+
+class TimedDataMixin:
+    """Time building the serialized data of a serializer"""
+
+    @property
+    def data(self):
+        with span('serialize'):
+            return super().data
+
+
+class RouteStats:
+    """Latency histogram and totals of the requests of a route"""
+
+    def __init__(self):
+        self.count = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.queries = 0
+        self.db_ms = 0.0
+        self.serialize_ms = 0.0
+        self.size = 0
+
+    def add(self, elapsed_ms, metrics, size):
+        self.count += 1
+        self.buckets[bisect.bisect_left(BUCKETS, elapsed_ms)] += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.queries += metrics.queries
+        self.db_ms += metrics.db_time * 1000
+        self.serialize_ms += metrics.spans.get('serialize', 0) * 1000
+        self.size += size or 0
+
+    def percentile(self, percent):
+        """Return the upper bound of the bucket holding the percentile"""
+        rank = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total_ms / self.count,
+            'max_ms': self.max_ms,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'mean_queries': self.queries / self.count,
+            'mean_db_ms': self.db_ms / self.count,
+            'mean_serialize_ms': self.serialize_ms / self.count,
+            'mean_size': self.size / self.count,
+            'histogram': {
+                str(bound): count
+                for bound, count in zip(BUCKETS + ('+Inf',), self.buckets)
+            },
+        }
+
+
+def record(route, metrics, size):
+    """Add a finished request to the stats of its route"""
+    elapsed_ms = (time.perf_counter() - metrics.start) * 1000
+    with _lock:
+        _routes.setdefault(route, RouteStats()).add(
+            elapsed_ms,
+            metrics,
+            size
+        )
+        for duration, sql, origin in metrics.slow_queries:
+            entry = (duration, next(_sequence), sql, origin, route)
+            if len(_slow_queries) < settings.INSTRUMENTATION_SLOW_QUERIES:
+                heapq.heappush(_slow_queries, entry)
+            else:
+                heapq.heappushpop(_slow_queries, entry)
+    for duration, sql, origin in metrics.slow_queries:
+        logger.warning('Slow query (%.1fms) on %s from %s: %s',
+                       duration * 1000, route, origin, sql)
+
+
+def snapshot():
+    """Return the stats of every route and the slowest queries"""
+    with _lock:
+        routes = {
+            route: stats.as_dict() for route, stats in _routes.items()
+        }
+        slow_queries = sorted(_slow_queries, reverse=True)
+
+    return {
+        'routes': routes,
+        'slow_queries': [
+            {'ms': duration * 1000, 'sql': sql, 'origin': origin,
+             'route': route}
+            for duration, _, sql, origin, route in slow_queries
+        ],
+    }
+
+
+def reset():
+    """Forget the collected stats"""
+    with _lock:
+        _routes.clear()
+        _slow_queries.clear()
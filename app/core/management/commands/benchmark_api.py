@@ -0,0 +1,153 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from core import benchmark
+
+
+def name_list(value):
+    """Parse a comma separated list of scenario names"""
+    names = [name for name in value.split(',') if name]
+    unknown = set(names) - set(benchmark.SCENARIOS)
+    if unknown:
+        raise ValueError(f'Unknown scenarios: {", ".join(sorted(unknown))}')
+
+    return names
+
+
+class Command(BaseCommand):
+    """Django command to measure the latency and throughput of the API"""
+    help = 'Benchmark the API endpoints on a seeded synthetic dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=3)
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=100,
+            help='Recipes per user'
+        )
+        parser.add_argument('--tags', type=int, default=20)
+        parser.add_argument('--ingredients', type=int, default=30)
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Timed requests per scenario'
+        )
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--scenarios',
+            type=name_list,
+            default=list(benchmark.SCENARIOS),
+            help='Comma separated scenarios to run'
+        )
+        parser.add_argument(
+            '--server',
+            action='store_true',
+            help='Send the requests to a local WSGI server over HTTP'
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Invalidate the cached responses before each request'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--baseline',
+            help='JSON results to compare against, failing on regressions'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Allowed p95 growth over the baseline, as a fraction'
+        )
+        parser.add_argument(
+            '--save-baseline',
+            help='File to store the results in, as the new baseline'
+        )
+
+    def _report(self, name, result):
+        """Write the statistics of a scenario"""
+        queries = '-' if result['queries'] is None \
+            else f'{result["queries"]:.1f}'
+        self.stdout.write(
+            f'{name:<22} {result["p50"]:>8.2f} {result["p95"]:>8.2f} '
+            f'{result["p99"]:>8.2f} {result["rps"]:>8.1f} {queries:>8} '
+            f'{result["errors"]:>6}'
+        )
+
+    def _run(self, options):
+        """Seed the dataset and time every scenario"""
+        from recipe import caching
+
+        dataset = benchmark.Dataset(
+            options['users'],
+            options['recipes'],
+            options['tags'],
+            options['ingredients'],
+            seed=options['seed']
+        )
+        before_request = None
+        if options['cold']:
+            def before_request(user):
+                caching.bump_user_version(user['id'])
+
+        transport = None
+        try:
+            dataset.seed()
+            transport = benchmark.WSGIServerTransport() \
+                if options['server'] else benchmark.TestClientTransport()
+            self.stdout.write(
+                f'{"scenario":<22} {"p50 ms":>8} {"p95 ms":>8} '
+                f'{"p99 ms":>8} {"req/s":>8} {"queries":>8} {"errors":>6}'
+            )
+            results = {}
+            for name in options['scenarios']:
+                results[name] = benchmark.run_scenario(
+                    transport,
+                    dataset,
+                    name,
+                    options['requests'],
+                    options['warmup'],
+                    before_request
+                )
+                self._report(name, results[name])
+        finally:
+            if transport:
+                transport.close()
+            dataset.cleanup()
+
+        return results
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['users'] < 1 or \
+                options['recipes'] < 1:
+            raise CommandError('Users, recipes and requests must be > 0')
+
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver', '127.0.0.1']
+        with override_settings(ALLOWED_HOSTS=hosts,
+                               **benchmark.UNTHROTTLED):
+            results = self._run(options)
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+            self.stdout.write(f'Saved baseline {options["save_baseline"]}')
+
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+            regressions = benchmark.compare(
+                results,
+                baseline,
+                options['tolerance']
+            )
+            if regressions:
+                raise CommandError(
+                    'Regressions found:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('No regressions found'))
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from django.urls import reverse
+
+from core import benchmark
+from core.authentication import invalidate_token, sign_token
+
+
+class Command(BaseCommand):
+    """Django command to time the authentication of tag listings"""
+    help = 'Time listing tags authenticated by device tokens, looked up ' \
+           'or cached, and by signed tokens'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+
+    def _time(self, transport, token, requests, before_request):
+        """Return the p50 and p95 ms and the queries per request"""
+        path = reverse('recipe:tag-list')
+        # Warms the tag response cache up, leaving authentication to time
+        transport.request('GET', path, token=token)
+        timings = []
+        queries = 0
+        for _ in range(requests):
+            before_request()
+            status, elapsed, count = transport.request(
+                'GET', path, token=token
+            )
+            if status != 200:
+                raise CommandError(f'Listing tags failed with {status}')
+            timings.append(elapsed * 1000)
+            queries += count
+        timings.sort()
+
+        return (benchmark.percentile(timings, 50),
+                benchmark.percentile(timings, 95),
+                queries / requests)
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('Requests must be > 0')
+        self.stdout.write(
+            f'{"token":<12} {"p50 ms":>8} {"p95 ms":>8} {"queries":>8}'
+        )
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        # Device tokens are still accepted in the signed mode. Seeded rows
+        # are rolled back once measured
+        with override_settings(ALLOWED_HOSTS=hosts,
+                               AUTH_TOKEN_MODE='signed'), \
+                transaction.atomic():
+            dataset = benchmark.Dataset(1, 0, 20, 0)
+            dataset.seed()
+            user = dataset.users[0]
+            signed, _ = sign_token(get_user_model()(pk=user['id']))
+            transport = benchmark.TestClientTransport()
+            for name, token, before_request in (
+                ('db', user['token'],
+                 lambda: invalidate_token(user['token'])),
+                ('db cached', user['token'], lambda: None),
+                ('signed', signed, lambda: None),
+            ):
+                p50, p95, queries = self._time(
+                    transport, token, options['requests'], before_request
+                )
+                self.stdout.write(
+                    f'{name:<12} {p50:>8.3f} {p95:>8.3f} {queries:>8.1f}'
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from core import benchmark
+from core.management.commands.benchmark_api import name_list
+
+
+READ_SCENARIOS = ['recipe_list', 'recipe_list_filtered', 'recipe_detail']
+
+
+class Command(BaseCommand):
+    """Django command to compare WSGI and ASGI throughput under load"""
+    help = 'Benchmark the API under WSGI and ASGI with many slow clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=3)
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=100,
+            help='Recipes per user'
+        )
+        parser.add_argument('--tags', type=int, default=20)
+        parser.add_argument('--ingredients', type=int, default=30)
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=400,
+            help='Requests per server'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=100,
+            help='Concurrent clients of the ASGI server'
+        )
+        parser.add_argument(
+            '--wsgi-workers',
+            type=int,
+            default=8,
+            help='Worker threads of the WSGI server'
+        )
+        parser.add_argument(
+            '--client-delay-ms',
+            type=float,
+            default=50,
+            help='Time each client takes to send its request'
+        )
+        parser.add_argument(
+            '--scenarios',
+            type=name_list,
+            default=READ_SCENARIOS,
+            help='Comma separated scenarios to cycle through'
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Invalidate the cached responses before each request'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def _report(self, name, result):
+        """Write the statistics of a server"""
+        self.stdout.write(
+            f'{name:<6} {result["p50"]:>8.2f} {result["p95"]:>8.2f} '
+            f'{result["p99"]:>8.2f} {result["rps"]:>8.1f} '
+            f'{result["errors"]:>6}'
+        )
+
+    def _run(self, options):
+        """Seed the dataset and serve the same requests with each server"""
+        from recipe import caching
+
+        dataset = benchmark.Dataset(
+            options['users'],
+            options['recipes'],
+            options['tags'],
+            options['ingredients'],
+            seed=options['seed']
+        )
+        before_request = None
+        if options['cold']:
+            def before_request(user):
+                caching.bump_user_version(user['id'])
+
+        delay = options['client_delay_ms'] / 1000
+        try:
+            dataset.seed()
+            requests = benchmark.build_requests(
+                dataset,
+                options['scenarios'],
+                options['requests']
+            )
+            self.stdout.write(
+                f'{"server":<6} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+                f'{"req/s":>8} {"errors":>6}'
+            )
+            self._report('wsgi', benchmark.run_wsgi(
+                requests,
+                options['wsgi_workers'],
+                delay,
+                before_request
+            ))
+            self._report('asgi', benchmark.run_asgi(
+                requests,
+                options['concurrency'],
+                delay,
+                before_request
+            ))
+        finally:
+            dataset.cleanup()
+
+    def handle(self, *args, **options):
+        if min(options['requests'], options['users'], options['recipes'],
+               options['concurrency'], options['wsgi_workers']) < 1:
+            raise CommandError(
+                'Users, recipes, requests, concurrency and workers must be > 0'
+            )
+
+        hosts = [*settings.ALLOWED_HOSTS, '127.0.0.1']
+        with override_settings(ALLOWED_HOSTS=hosts,
+                               **benchmark.UNTHROTTLED):
+            self._run(options)
@@ -0,0 +1,117 @@
+import statistics
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core import filters
+from core.models import Tag, Recipe
+
+
+def int_list(value):
+    """Parse a comma separated list of integers"""
+    return [int(item) for item in value.split(',')]
+
+
+def seed_recipes(count, tags, tags_per_recipe):
+    """Create a user with count recipes, each linked to a few tags"""
+    user = get_user_model().objects.create_user(
+        f'benchmark-{uuid.uuid4().hex}@example.com',
+        uuid.uuid4().hex
+    )
+    Tag.objects.bulk_create(
+        Tag(user=user, name=f'Tag {i}') for i in range(tags)
+    )
+    Recipe.objects.bulk_create(
+        Recipe(user=user, title=f'Recipe {i}', time_minutes=5, price=5)
+        for i in range(count)
+    )
+    tag_ids = list(
+        Tag.objects.filter(user=user).order_by('id')
+        .values_list('id', flat=True)
+    )
+    recipe_ids = Recipe.objects.filter(user=user).order_by('id') \
+        .values_list('id', flat=True)
+    Recipe.tags.through.objects.bulk_create(
+        (
+            Recipe.tags.through(
+                recipe_id=recipe_id,
+                tag_id=tag_ids[(i + offset) % tags]
+            )
+            for i, recipe_id in enumerate(recipe_ids)
+            for offset in range(tags_per_recipe)
+        ),
+        batch_size=5000
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    return user, tag_ids
+
+
+class Command(BaseCommand):
+    """Django command to time the recipe tag filter on a seeded dataset"""
+    help = 'Time filtering recipes by tags against recipe and id counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes',
+            type=int_list,
+            default=[1000, 10000],
+            help='Comma separated recipe counts to seed'
+        )
+        parser.add_argument(
+            '--filter-ids',
+            type=int_list,
+            default=[1, 5, 20],
+            help='Comma separated numbers of tag ids to filter by'
+        )
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def _time(self, queryset, repeat):
+        """Return the median time in ms to fetch the first page"""
+        page = queryset.order_by('id')[:settings.API_PAGE_SIZE]
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(page.values_list('id', flat=True))
+            timings.append((time.perf_counter() - start) * 1000)
+
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"recipes":>8} {"ids":>4} {"join+distinct":>14} '
+            f'{"exists(any)":>12} {"all":>8}  (median ms)'
+        )
+        # Seeded rows are rolled back once measured
+        with transaction.atomic():
+            for count in options['recipes']:
+                user, tag_ids = seed_recipes(
+                    count,
+                    max(options['tags'], max(options['filter_ids'])),
+                    options['tags_per_recipe']
+                )
+                recipes = Recipe.objects.filter(user=user)
+                for id_count in options['filter_ids']:
+                    ids = tag_ids[:id_count]
+                    timings = [
+                        self._time(queryset, options['repeat'])
+                        for queryset in (
+                            recipes.filter(tags__id__in=ids).distinct(),
+                            filters.filter_by_related(recipes, 'tags', ids),
+                            filters.filter_by_related(
+                                recipes, 'tags', ids, filters.MATCH_ALL
+                            ),
+                        )
+                    ]
+                    self.stdout.write(
+                        f'{count:>8} {id_count:>4} {timings[0]:>14.2f} '
+                        f'{timings[1]:>12.2f} {timings[2]:>8.2f}'
+                    )
+            transaction.set_rollback(True)
@@ -0,0 +1,142 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.renderers import JSONRenderer
+
+from core import benchmark
+from core.management.commands.benchmark_filters import int_list
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """Django command to time the recipe serialization paths"""
+    help = 'Time serializing recipes with prefetches, the fast path and ' \
+           'aggregated relations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes',
+            type=int_list,
+            default=[100, 1000],
+            help='Comma separated numbers of recipes to serialize'
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def _time(self, serialize, repeat):
+        """Return the median ms and queries to serialize, and the output"""
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                content = JSONRenderer().render(serialize())
+                timings.append((time.perf_counter() - start) * 1000)
+
+        return statistics.median(timings), len(queries), content
+
+    def _compare(self, label, modes, repeat):
+        """Time every mode, checking they render the same content"""
+        results = []
+        for name, serialize in modes:
+            ms, queries, content = self._time(serialize, repeat)
+            if results and content != results[0][3]:
+                raise CommandError(f'{name} output differs for {label}')
+            results.append((name, ms, queries, content))
+        for name, ms, queries, _ in results:
+            self.stdout.write(
+                f'{label:<12} {name:<16} {ms:>9.2f} {queries:>8}'
+            )
+
+    def _view(self, action):
+        from recipe.views import RecipeViewSet
+
+        return RecipeViewSet(action=action, kwargs={})
+
+    def _list_modes(self, recipes, count):
+        """Return the ways to serialize a page of count recipes"""
+        from recipe import fast
+        from recipe.serializers import RecipeSerializer
+
+        queryset = self._view('list')._apply_query_plan(recipes)
+        serializer = fast.FastSerializer(RecipeSerializer())
+        modes = [
+            ('prefetch', lambda: RecipeSerializer(
+                queryset[:count], many=True
+            ).data),
+            ('fast', lambda: serializer.to_representation(
+                list(serializer.rows(recipes, aggregate=False)[:count])
+            )),
+        ]
+        if fast.aggregates_supported(recipes):
+            modes.append(('fast+array_agg', lambda: (
+                serializer.to_representation(
+                    list(serializer.rows(recipes, aggregate=True)[:count])
+                )
+            )))
+
+        return modes
+
+    def _detail_modes(self, recipes, count):
+        """Return the ways to serialize count recipes one by one"""
+        from recipe import fast
+        from recipe.serializers import RecipeDetailSerializer
+        from recipe.views import RecipeViewSet
+
+        view = self._view('retrieve')
+        relations = RecipeViewSet.detail_relations
+        queryset = recipes.only('id', 'title', 'time_minutes', 'price',
+                                'link', 'image')
+        ids = list(recipes.values_list('id', flat=True)[:count])
+
+        def prefetched():
+            return [
+                RecipeDetailSerializer(
+                    queryset.prefetch_related(
+                        *view._related_prefetches('id', 'name')
+                    ).get(pk=pk)
+                ).data
+                for pk in ids
+            ]
+
+        def aggregated():
+            data = []
+            for pk in ids:
+                recipe = fast.annotate_related_objects(
+                    queryset, relations
+                ).get(pk=pk)
+                fast.attach_related_objects(recipe, relations)
+                data.append(RecipeDetailSerializer(recipe).data)
+            return data
+
+        modes = [('prefetch', prefetched)]
+        if fast.aggregates_supported(recipes):
+            modes.append(('jsonb_agg', aggregated))
+
+        return modes
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"case":<12} {"mode":<16} {"median ms":>9} {"queries":>8}'
+        )
+        # Seeded rows are rolled back once measured
+        with transaction.atomic():
+            dataset = benchmark.Dataset(1, max(options['recipes']), 20, 30)
+            dataset.seed()
+            recipes = Recipe.objects.filter(
+                user_id=dataset.users[0]['id']
+            ).order_by('id')
+            for count in options['recipes']:
+                self._compare(
+                    f'list {count}',
+                    self._list_modes(recipes, count),
+                    options['repeat']
+                )
+            self._compare(
+                'detail x10',
+                self._detail_modes(recipes, 10),
+                options['repeat']
+            )
+            transaction.set_rollback(True)
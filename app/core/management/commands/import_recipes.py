@@ -0,0 +1,181 @@
+import csv
+import itertools
+import json
+import os
+import resource
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import bulk
+from core.models import Tag, Ingredient, Recipe
+
+
+def read_ndjson(file):
+    """Yield a dict per non blank line of a NDJSON file"""
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(file):
+    """Yield a dict per CSV row, splitting tags/ingredients on '|'"""
+    for row in csv.DictReader(file):
+        for key in ('tags', 'ingredients'):
+            row[key] = [name for name in (row.get(key) or '').split('|')
+                        if name]
+        yield row
+
+
+def related_names(values):
+    """Return the names of tags/ingredients given as names or objects"""
+    return [
+        value['name'] if isinstance(value, dict) else str(value)
+        for value in values or ()
+    ]
+
+
+class NameMap:
+    """Name to id map of a user's tags or ingredients"""
+
+    def __init__(self, model, user):
+        self.model = model
+        self.user = user
+        self.ids = dict(
+            model.objects.filter(user=user).values_list('name', 'id')
+        )
+
+    def resolve(self, rows, key):
+        """Create the missing objects named in the rows, return their ids"""
+        missing = dict.fromkeys(
+            name for row in rows for name in row[key] if name not in self.ids
+        )
+        created = bulk.insert(
+            self.model,
+            [self.model(user=self.user, name=name) for name in missing]
+        )
+        self.ids.update((obj.name, obj.pk) for obj in created)
+
+        return [[self.ids[name] for name in row[key]] for row in rows]
+
+
+class Command(BaseCommand):
+    """Django command to import recipes from NDJSON or CSV files"""
+    help = 'Import recipes, with their tags and ingredients, for a user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON or CSV file to import')
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Email of the user owning the recipes'
+        )
+        parser.add_argument(
+            '--format',
+            choices=('ndjson', 'csv'),
+            help='File format, guessed from the extension by default'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Recipes written per transaction'
+        )
+        parser.add_argument(
+            '--offset',
+            type=int,
+            help='Number of rows to skip, defaults to the checkpoint'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='File storing the number of rows imported so far'
+        )
+
+    def _read_checkpoint(self, path):
+        """Return the offset stored in the checkpoint file"""
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path) as file:
+            return int(file.read().strip() or 0)
+
+    def _write_checkpoint(self, path, offset):
+        """Atomically store the offset in the checkpoint file"""
+        if not path:
+            return
+        with open(f'{path}.tmp', 'w') as file:
+            file.write(str(offset))
+        os.replace(f'{path}.tmp', path)
+
+    def _parse(self, row, number):
+        """Return the recipe fields and related names of a row"""
+        try:
+            return {
+                'title': row['title'],
+                'time_minutes': int(row['time_minutes']),
+                'price': Decimal(str(row['price'])),
+                'link': row.get('link') or '',
+                'tags': related_names(row.get('tags')),
+                'ingredients': related_names(row.get('ingredients')),
+            }
+        except (KeyError, TypeError, ValueError, InvalidOperation) as exc:
+            raise CommandError(f'Invalid row {number}: {exc!r}')
+
+    def _write_batch(self, user, tags, ingredients, rows):
+        """Write a batch of parsed rows in a single transaction"""
+        with transaction.atomic():
+            tag_ids = tags.resolve(rows, 'tags')
+            ingredient_ids = ingredients.resolve(rows, 'ingredients')
+            bulk.create_objects(Recipe, [
+                dict(row, user=user, tags=row_tags,
+                     ingredients=row_ingredients)
+                for row, row_tags, row_ingredients
+                in zip(rows, tag_ids, ingredient_ids)
+            ])
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["user"]} does not exist')
+
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'ndjson'
+        )
+        checkpoint = options['checkpoint']
+        offset = options['offset']
+        if offset is None:
+            offset = self._read_checkpoint(checkpoint)
+        batch_size = options['batch_size']
+
+        tags = NameMap(Tag, user)
+        ingredients = NameMap(Ingredient, user)
+        reader = read_csv if file_format == 'csv' else read_ndjson
+        imported = 0
+        start = time.monotonic()
+        with open(path, newline='', encoding='utf-8') as file:
+            rows = itertools.islice(reader(file), offset, None)
+            while True:
+                batch = [
+                    self._parse(row, offset + imported + number + 1)
+                    for number, row in enumerate(
+                        itertools.islice(rows, batch_size)
+                    )
+                ]
+                if not batch:
+                    break
+                self._write_batch(user, tags, ingredients, batch)
+                imported += len(batch)
+                self._write_checkpoint(checkpoint, offset + imported)
+                self.stdout.write(f'Imported {offset + imported} rows')
+
+        elapsed = time.monotonic() - start
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} recipes in {elapsed:.2f}s '
+            f'({imported / elapsed if elapsed else 0:.0f} rows/sec), '
+            f'peak memory {peak_memory / 1024:.1f} MB'
+        ))
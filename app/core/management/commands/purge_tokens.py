@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import DeviceToken
+
+
+class Command(BaseCommand):
+    """Django command to delete the expired tokens in batches"""
+    help = 'Delete the expired authentication tokens, a batch at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Tokens deleted per transaction'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Seconds to wait between batches'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        # Each batch commits on its own, so locks are only held briefly
+        while True:
+            deleted = DeviceToken.objects.purge_expired(batch_size)
+            total += deleted
+            if deleted < batch_size:
+                break
+            time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {total} expired tokens'
+        ))
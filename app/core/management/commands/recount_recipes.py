@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import counters
+
+
+class Command(BaseCommand):
+    """Django command to repair the recipe counts of tags and ingredients"""
+    help = 'Recompute the recipe counts of tags and ingredients in bulk'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            repaired = counters.recount()
+
+        for model, count in repaired.items():
+            self.stdout.write(
+                f'Repaired {count} {model._meta.verbose_name_plural}'
+            )
+        self.stdout.write(self.style.SUCCESS('Recipe counts are correct'))
@@ -2,20 +2,45 @@ import time
 
 from django.db import connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """Django command to pause exec until db is available"""
 
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='Seconds to wait before failing'
+        )
+        parser.add_argument(
+            '--max-delay',
+            type=float,
+            default=5,
+            help='Longest wait between attempts, in seconds'
+        )
+
     def handle(self, *args, **options):
         self.stdout.write('Waiting for DB...')
-        db_conn = None
-        while not db_conn:
+        connection = connections[options['database']]
+        deadline = time.monotonic() + options['timeout']
+        delay = 0.1
+        while True:
             try:
-                db_conn = connections['default']
+                connection.ensure_connection()
+                break
             except OperationalError:
-                self.stdout.write('DB is unavailable, waiting 1 second...')
-                time.sleep(1)
+                if time.monotonic() + delay > deadline:
+                    raise CommandError(
+                        f'DB unavailable after {options["timeout"]:g}s'
+                    )
+                self.stdout.write(
+                    f'DB is unavailable, waiting {delay:g} seconds...'
+                )
+                time.sleep(delay)
+                delay = min(delay * 2, options['max_delay'])
 
         self.stdout.write(self.style.SUCCESS('DB is ready!'))
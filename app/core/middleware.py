@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+from django.conf import settings
+
+from core import instrumentation
+
+
+class InstrumentationMiddleware:
+    """Time requests and their queries, per route
+
+    Queries are timed by the execute wrapper core.signals installs on
+    every connection. The timings are added to the response as a
+    Server-Timing header and aggregated by core.instrumentation, which
+    keeps the slowest queries with the code running them. Streamed
+    response bodies are produced after the request is recorded, so they
+    aren't measured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Let handlers await the middleware, as MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def _route(self, request):
+        """Return the method and URL name the request was routed to"""
+        match = getattr(request, 'resolver_match', None)
+        name = match.view_name if match else 'unresolved'
+
+        return f'{request.method} {name}'
+
+    def _server_timing(self, metrics):
+        """Return the Server-Timing header value of the metrics"""
+        elapsed = time.perf_counter() - metrics.start
+        timings = [
+            f'app;dur={elapsed * 1000:.2f}',
+            f'db;dur={metrics.db_time * 1000:.2f};'
+            f'desc="{metrics.queries} queries"',
+        ]
+        timings.extend(
+            f'{name};dur={duration * 1000:.2f}'
+            for name, duration in metrics.spans.items()
+        )
+
+        return ', '.join(timings)
+
+    def _finish(self, request, response, metrics):
+        """Report the metrics of a request"""
+        size = None if response.streaming else len(response.content)
+        if settings.INSTRUMENTATION_SERVER_TIMING:
+            response['Server-Timing'] = self._server_timing(metrics)
+        instrumentation.record(self._route(request), metrics, size)
+
+        return response
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = instrumentation.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics = instrumentation.end_request(token)
+
+        return self._finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        token = instrumentation.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics = instrumentation.end_request(token)
+
+        return self._finish(request, response, metrics)
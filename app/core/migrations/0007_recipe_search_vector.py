@@ -0,0 +1,70 @@
+# Generated by Django 3.1.4 on 2026-10-17 06:01
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+CREATE_SEARCH_INDEXES = [
+    'CREATE INDEX core_recipe_search_idx ON core_recipe '
+    'USING gin (search_vector);',
+    'CREATE INDEX core_recipe_title_trgm_idx ON core_recipe '
+    'USING gin (title gin_trgm_ops);',
+]
+
+DROP_SEARCH_INDEXES = [
+    'DROP INDEX IF EXISTS core_recipe_search_idx;',
+    'DROP INDEX IF EXISTS core_recipe_title_trgm_idx;',
+]
+
+FILL_SEARCH_VECTORS = """
+UPDATE core_recipe r SET search_vector =
+    setweight(to_tsvector(%s::regconfig, r.title), 'A') ||
+    setweight(to_tsvector(%s::regconfig, coalesce((
+        SELECT string_agg(t.name, ' ') FROM core_tag t
+        JOIN core_recipe_tags rt ON rt.tag_id = t.id
+        WHERE rt.recipe_id = r.id
+    ), '')), 'B') ||
+    setweight(to_tsvector(%s::regconfig, coalesce((
+        SELECT string_agg(i.name, ' ') FROM core_ingredient i
+        JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+        WHERE ri.recipe_id = r.id
+    ), '')), 'C');
+"""
+
+
+def create_search_indexes(apps, schema_editor):
+    """Index and fill the search vectors, GIN indexes need Postgres"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in CREATE_SEARCH_INDEXES:
+        schema_editor.execute(sql)
+    schema_editor.execute(
+        FILL_SEARCH_VECTORS,
+        [settings.RECIPE_SEARCH_CONFIG] * 3
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in DROP_SEARCH_INDEXES:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
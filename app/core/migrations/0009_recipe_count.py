@@ -0,0 +1,48 @@
+# Generated by Django 3.1.4 on 2026-10-17 06:15
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_recipes(apps, schema_editor):
+    """Fill the recipe counts of the existing tags and ingredients"""
+    Recipe = apps.get_model('core', 'Recipe')
+    for field_name, column in (('tags', 'tag_id'),
+                               ('ingredients', 'ingredient_id')):
+        field = Recipe._meta.get_field(field_name)
+        counts = field.remote_field.through.objects.filter(
+            **{column: OuterRef('pk')}
+        ).order_by().values(column).annotate(count=Count('pk'))
+        field.related_model.objects.update(
+            recipe_count=Coalesce(Subquery(counts.values('count')), 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'recipe_count', 'name', 'id'], name='core_ingredient_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'recipe_count', 'name', 'id'], name='core_tag_popular_idx'),
+        ),
+        migrations.RunPython(count_recipes, migrations.RunPython.noop),
+    ]
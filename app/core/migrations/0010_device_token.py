@@ -0,0 +1,53 @@
+# Generated by Django 3.1.4 on 2026-10-17 06:49
+
+import core.models
+from datetime import timedelta
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def copy_auth_tokens(apps, schema_editor):
+    """Keep the authtoken tokens working, expiring TOKEN_TTL from now"""
+    Token = apps.get_model('authtoken', 'Token')
+    DeviceToken = apps.get_model('core', 'DeviceToken')
+    expires = timezone.now() + timedelta(seconds=settings.TOKEN_TTL)
+    DeviceToken.objects.bulk_create(
+        (
+            DeviceToken(key=key, user_id=user_id, expires=expires)
+            for key, user_id in Token.objects.values_list('key', 'user_id')
+            .iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_count'),
+        ('authtoken', '0003_tokenproxy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceToken',
+            fields=[
+                ('key', models.CharField(default=core.models.generate_token_key, editable=False, max_length=40, primary_key=True, serialize=False)),
+                ('device', models.CharField(blank=True, max_length=100)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('expires', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='device_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='devicetoken',
+            index=models.Index(fields=['expires'], name='core_devicetoken_expires_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='devicetoken',
+            constraint=models.UniqueConstraint(fields=('user', 'device'), name='core_devicetoken_user_device_uniq'),
+        ),
+        migrations.RunPython(copy_auth_tokens, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,12 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 from django.conf import settings
+from django.utils import timezone
 
+from datetime import timedelta
+import binascii
 import uuid
 import os
 
@@ -15,6 +19,11 @@ def recipe_image_file_path(instance, filename):
     return os.path.join('uploads/recipe/', filename)
 
 
+def generate_token_key():
+    """Generate a random key for a new token"""
+    return binascii.hexlify(os.urandom(20)).decode()
+
+
 class UserManager(BaseUserManager):
 
     def create_user(self, email, password, **extra_fields):
@@ -48,6 +57,17 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = 'email'
 
+    def delete(self, *args, **kwargs):
+        """Delete the user with everything it owns
+
+        Its tags and ingredients go with its recipes, so neither are
+        updated as the others are deleted.
+        """
+        from core import counters
+
+        with counters.deleting():
+            return super().delete(*args, **kwargs)
+
 
 class Tag(models.Model):
     """Tag to be used for a recipe"""
@@ -56,6 +76,21 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    # Number of recipes using it, maintained by core.counters
+    recipe_count = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_tag_user_name_idx'
+            ),
+            models.Index(
+                fields=['user', 'recipe_count', 'name', 'id'],
+                name='core_tag_popular_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -68,6 +103,21 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    # Number of recipes using it, maintained by core.counters
+    recipe_count = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_ingredient_user_name_idx'
+            ),
+            models.Index(
+                fields=['user', 'recipe_count', 'name', 'id'],
+                name='core_ingredient_popular_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -86,6 +136,91 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # Also touched when the tags or ingredients of the recipe change
+    updated_at = models.DateTimeField(auto_now=True)
+    # Title, tag and ingredient names, maintained by core.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'id'],
+                name='core_recipe_user_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class DeviceTokenManager(models.Manager):
+
+    def issue(self, user, device=''):
+        """Issue a new token to the device, replacing its previous one"""
+        with transaction.atomic():
+            # Locking the user serializes its logins, which would race to
+            # create the token of the device otherwise
+            list(type(user)._default_manager.select_for_update()
+                 .filter(pk=user.pk).values_list('pk'))
+            self.filter(user=user, device=device).delete()
+            return self.create(
+                user=user,
+                device=device,
+                expires=timezone.now() + timedelta(seconds=settings.TOKEN_TTL)
+            )
+
+    def purge_expired(self, batch_size):
+        """Delete up to batch_size expired tokens, returning how many"""
+        now = timezone.now()
+        keys = list(
+            self.filter(expires__lte=now).order_by('expires')
+            .values_list('key', flat=True)[:batch_size]
+        )
+        if not keys:
+            return 0
+        # Expired tokens are no longer accepted, so their deletion needs
+        # neither signals nor collecting them first
+        return self.filter(key__in=keys, expires__lte=now)._raw_delete(
+            router.db_for_write(self.model)
+        )
+
+
+class DeviceToken(models.Model):
+    """Authentication token of a user on one of their devices
+
+    Tokens expire TOKEN_TTL seconds after being issued or last renewed,
+    which core.authentication does as they are used.
+    """
+    key = models.CharField(
+        max_length=40,
+        primary_key=True,
+        default=generate_token_key,
+        editable=False
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='device_tokens',
+    )
+    device = models.CharField(max_length=100, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    expires = models.DateTimeField()
+
+    objects = DeviceTokenManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'device'],
+                name='core_devicetoken_user_device_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['expires'],
+                name='core_devicetoken_expires_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,158 @@
+import contextvars
+import itertools
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from rest_framework.permissions import SAFE_METHODS
+
+from core.checks import check_shared_cache
+
+
+ROUND_ROBIN = 'round_robin'
+LEAST_LAG = 'least_lag'
+
+_replica = contextvars.ContextVar('replica', default=None)
+_sequence = itertools.count()
+_lock = threading.Lock()
+_lags = {}
+
+
+def _measure_lag(alias):
+    """Return the seconds a replica is behind the primary"""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT COALESCE(EXTRACT(EPOCH FROM '
+                'now() - pg_last_xact_replay_timestamp()), 0)'
+            )
+            return float(cursor.fetchone()[0])
+    except DatabaseError:
+        return float('inf')
+
+
+def replica_lag(alias):
+    """Return the lag of a replica, measured at most once per interval
+
+    Unreachable replicas lag infinitely.
+    """
+    now = time.monotonic()
+    with _lock:
+        checked = _lags.get(alias)
+    if checked and now - checked[0] < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return checked[1]
+    lag = _measure_lag(alias)
+    with _lock:
+        _lags[alias] = (now, lag)
+
+    return lag
+
+
+def select_replica():
+    """Return the alias of the replica to read from
+
+    Replicas are taken in turns, or the least lagging one is taken. The
+    primary is returned when every replica lags more than
+    REPLICA_MAX_LAG seconds.
+    """
+    replicas = settings.DATABASE_REPLICAS
+    if settings.REPLICA_SELECTION == LEAST_LAG:
+        lags = {alias: replica_lag(alias) for alias in replicas}
+        alias = min(replicas, key=lags.get)
+        if lags[alias] > settings.REPLICA_MAX_LAG:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    return replicas[next(_sequence) % len(replicas)]
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def check_pin_cache():
+    """Refuse replicas whose primary pins would not reach every process"""
+    if settings.DATABASE_REPLICAS:
+        check_shared_cache(settings.REPLICA_PIN_CACHE_ALIAS, 'Replica reads')
+
+
+def pin_to_primary(user_id):
+    """Read the data of the user from the primary for a while
+
+    So users read their own writes while the replicas catch up.
+    """
+    caches[settings.REPLICA_PIN_CACHE_ALIAS].set(
+        _pin_key(user_id),
+        True,
+        settings.REPLICA_PIN_SECONDS
+    )
+
+
+def is_pinned(user_id):
+    """Return whether the user reads from the primary"""
+    return caches[settings.REPLICA_PIN_CACHE_ALIAS].get(
+        _pin_key(user_id),
+        False
+    )
+
+
+def start_replica_reads(alias):
+    """Route the reads that follow to a replica, returning a token"""
+    return _replica.set(alias)
+
+
+def end_replica_reads(token):
+    """Route the reads back to where they went before"""
+    _replica.reset(token)
+
+
+class ReplicaRouter:
+    """Route the reads of replica-enabled requests to their replica"""
+
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+
+        return None
+
+
+class ReplicaReadMixin:
+    """Serve the safe requests of a view from a read replica
+
+    Requests are authenticated on the primary. Users writing through the
+    view are pinned to the primary for REPLICA_PIN_SECONDS. Streamed
+    bodies are produced after the view returns, so they are read from the
+    primary.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        user_id = request.user.pk
+        if settings.DATABASE_REPLICAS and \
+                request.method in SAFE_METHODS and \
+                not (user_id and is_pinned(user_id)):
+            self._replica_token = start_replica_reads(select_replica())
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            self._replica_token = None
+            end_replica_reads(token)
+        elif request.method not in SAFE_METHODS and \
+                settings.DATABASE_REPLICAS and request.user.pk:
+            pin_to_primary(request.user.pk)
+
+        return super().finalize_response(request, response, *args, **kwargs)
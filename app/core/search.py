@@ -0,0 +1,92 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, \
+                                           SearchVector, TrigramSimilarity
+from django.db import connections, router
+from django.db.models import Exists, F, FloatField, OuterRef, Q, Subquery
+from django.db.models.functions import Cast, Greatest
+
+from core.models import Tag, Ingredient, Recipe
+
+
+def search_supported():
+    """Return whether the recipes live in a database with full-text search"""
+    return connections[router.db_for_write(Recipe)].vendor == 'postgresql'
+
+
+def _names(model):
+    """Return a subquery joining the names of a recipe's tags/ingredients"""
+    return Subquery(
+        model.objects.filter(recipe=OuterRef('pk'))
+        .values('recipe')
+        .annotate(names=StringAgg('name', ' '))
+        .values('names')
+    )
+
+
+def update_search_vectors(recipe_ids):
+    """Recompute the search vector of the recipes in a single UPDATE"""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids or not search_supported():
+        return
+    config = settings.RECIPE_SEARCH_CONFIG
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        search_vector=(
+            SearchVector('title', weight='A', config=config) +
+            SearchVector(_names(Tag), weight='B', config=config) +
+            SearchVector(_names(Ingredient), weight='C', config=config)
+        )
+    )
+
+
+def _prefix_query(text):
+    """Return a tsquery matching every word of the text as a prefix"""
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+
+    return SearchQuery(
+        ' & '.join(f'{word}:*' for word in words),
+        search_type='raw',
+        config=settings.RECIPE_SEARCH_CONFIG
+    )
+
+
+def search_recipes(queryset, text):
+    """Filter the recipes matching the text
+
+    On Postgres the recipes are annotated with search_rank, matching the
+    indexed search vector by word prefix or the title by trigram
+    similarity. Other databases fall back to substring matches.
+    """
+    if not search_supported():
+        return queryset.annotate(
+            tag_matches=Exists(Tag.objects.filter(
+                recipe=OuterRef('pk'),
+                name__icontains=text
+            )),
+            ingredient_matches=Exists(Ingredient.objects.filter(
+                recipe=OuterRef('pk'),
+                name__icontains=text
+            )),
+        ).filter(
+            Q(title__icontains=text) |
+            Q(tag_matches=True) |
+            Q(ingredient_matches=True)
+        )
+
+    query = _prefix_query(text)
+    if query is None:
+        return queryset.none()
+
+    return queryset.annotate(
+        search_rank=Cast(
+            Greatest(
+                SearchRank(F('search_vector'), query),
+                TrigramSimilarity('title', text)
+            ),
+            FloatField()
+        )
+    ).filter(Q(search_vector=query) | Q(title__trigram_similar=text))
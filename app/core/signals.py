@@ -0,0 +1,191 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+                                     pre_delete
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from core import counters, instrumentation, search
+from core.authentication import invalidate_token, \
+                                revoke_user_signed_tokens
+from core.models import DeviceToken, Tag, Ingredient, Recipe
+
+
+# Sent by core.bulk with the objects it created or updated, as bulk
+# queries don't send the model signals. relinked maps the M2M fields to
+# the change in the number of links of each related object relinked.
+bulk_written = Signal()
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    """Time the queries of every connection for core.instrumentation"""
+    if instrumentation.execute not in connection.execute_wrappers:
+        # First, as execute_wrapper() blocks pop the last wrapper on exit
+        connection.execute_wrappers.insert(0, instrumentation.execute)
+
+
+@receiver(post_delete, sender=DeviceToken)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Stop accepting a token as soon as it is deleted"""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """Drop cached tokens holding a stale copy of the saved user
+
+    Its signed tokens are revoked when deactivated or given a new password.
+    """
+    if created:
+        return
+    for key in DeviceToken.objects.filter(user=instance).values_list(
+            'key', flat=True):
+        invalidate_token(key)
+    # Only set until saved, when the password changed
+    if not instance.is_active or instance._password is not None:
+        revoke_user_signed_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    """Stop accepting the signed tokens of a deleted user"""
+    revoke_user_signed_tokens(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def update_saved_recipe_search(sender, instance, update_fields, **kwargs):
+    """Index the title of a saved recipe"""
+    if update_fields is None or 'title' in update_fields:
+        search.update_search_vectors([instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def update_renamed_related_search(sender, instance, created, **kwargs):
+    """Index the new name of a tag/ingredient in its recipes"""
+    if not created:
+        search.update_search_vectors(
+            instance.recipe_set.values_list('pk', flat=True)
+        )
+
+
+def _related_manager(sender, instance, reverse):
+    """Return the manager of the links of the instance changed by sender"""
+    if reverse:
+        return instance.recipe_set
+    field = next(field for field in Recipe._meta.many_to_many
+                 if field.remote_field.through is sender)
+
+    return getattr(instance, field.name)
+
+
+def _relinked_ids(sender, instance, action, reverse, pk_set):
+    """Return the ids of the objects on the other side of changed links
+
+    The objects actually losing their links to the instance on a remove
+    or a clear are only known before it, so they are kept on the instance
+    until then.
+    """
+    if action in ('pre_remove', 'pre_clear'):
+        linked = _related_manager(sender, instance, reverse)
+        if action == 'pre_remove':
+            linked = linked.filter(pk__in=pk_set)
+        instance._unlinked_ids = list(linked.values_list('pk', flat=True))
+    if action in ('post_remove', 'post_clear'):
+        return instance.__dict__.pop('_unlinked_ids', [])
+
+    return pk_set or []
+
+
+def touch(model, ids):
+    """Bump updated_at of the objects, whose representation changed"""
+    model.objects.filter(pk__in=ids).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_relinked_objects(sender, instance, action, reverse, model,
+                            pk_set, **kwargs):
+    """Touch the objects whose links changed and reindex the recipes
+
+    The recipe counts of the tags/ingredients are adjusted too.
+    """
+    ids = _relinked_ids(sender, instance, action, reverse, pk_set)
+    if action not in ('post_add', 'post_remove', 'post_clear') or not ids:
+        return
+    step = 1 if action == 'post_add' else -1
+    if reverse:
+        recipe_ids = ids
+        counters.adjust(type(instance), {instance.pk: step * len(ids)})
+    else:
+        recipe_ids = [instance.pk]
+        counters.adjust(model, dict.fromkeys(ids, step))
+    touch(Recipe, recipe_ids)
+    search.update_search_vectors(recipe_ids)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def touch_unlinked_recipes(sender, instance, **kwargs):
+    """Bump updated_at of the recipes losing a deleted tag/ingredient
+
+    They are kept on the instance to be reindexed once unlinked.
+    """
+    if counters.is_deleting():
+        return
+    instance._unlinked_recipe_ids = list(
+        instance.recipe_set.values_list('pk', flat=True)
+    )
+    touch(Recipe, instance._unlinked_recipe_ids)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def update_unlinked_search(sender, instance, **kwargs):
+    """Drop the name of a deleted tag/ingredient from its recipes' index"""
+    search.update_search_vectors(
+        instance.__dict__.pop('_unlinked_recipe_ids', [])
+    )
+
+
+@receiver(pre_delete, sender=Recipe)
+def uncount_deleted_recipe(sender, instance, **kwargs):
+    """Decrement the recipe counts of the tags/ingredients of a recipe"""
+    if counters.is_deleting():
+        return
+    for field in Recipe._meta.many_to_many:
+        getattr(instance, field.name).update(
+            recipe_count=F('recipe_count') - 1,
+            updated_at=timezone.now()
+        )
+
+
+@receiver(bulk_written)
+def count_bulk_relinked(sender, relinked, **kwargs):
+    """Adjust the recipe counts of the tags/ingredients bulk relinked"""
+    for field_name, deltas in relinked.items():
+        counters.adjust(sender._meta.get_field(field_name).related_model,
+                        deltas)
+
+
+@receiver(bulk_written, sender=Recipe)
+def update_bulk_written_search(sender, objs, **kwargs):
+    """Index the recipes written by bulk queries"""
+    search.update_search_vectors(obj.pk for obj in objs)
+
+
+@receiver(bulk_written, sender=Tag)
+@receiver(bulk_written, sender=Ingredient)
+def update_bulk_renamed_search(sender, objs, **kwargs):
+    """Index the names of the tags/ingredients bulk written in their recipes"""
+    if not objs or not search.search_supported():
+        return
+    field = next(field for field in Recipe._meta.many_to_many
+                 if field.related_model is sender)
+    search.update_search_vectors(
+        Recipe.objects.filter(
+            **{f'{field.name}__in': objs}
+        ).values_list('pk', flat=True).distinct()
+    )
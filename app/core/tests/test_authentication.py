@@ -0,0 +1,262 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.authentication import SignedTokenAuthentication, \
+                                check_revocation_cache, sign_token
+from core.models import DeviceToken, Tag
+
+
+TAGS_URL = reverse('recipe:tag-list')
+ME_URL = reverse('user:me')
+REVOKE_URL = reverse('user:token-revoke')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating requests with cached tokens"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123456',
+            name='Test Name'
+        )
+        self.token = DeviceToken.objects.issue(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_cached_after_first_request(self):
+        """Test the token is only looked up on the first request"""
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_invalid_token_rejected(self):
+        """Test an unknown token is rejected"""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops working immediately"""
+        self.client.get(TAGS_URL)
+        self.token.delete()
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test tokens of a deactivated user stop working immediately"""
+        self.client.get(TAGS_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updated_user_not_stale(self):
+        """Test updating the user through the API refreshes the cache"""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'New Name'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New Name')
+
+    def test_expired_token_rejected(self):
+        """Test a token stops working once expired, even when cached"""
+        self.client.get(ME_URL)
+        DeviceToken.objects.filter(pk=self.token.pk).update(
+            expires=timezone.now() - timedelta(seconds=1)
+        )
+        cache.clear()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_renewed_when_used(self):
+        """Test a token is renewed once the renew interval went by"""
+        expires = timezone.now() + timedelta(
+            seconds=settings.TOKEN_TTL - settings.TOKEN_RENEW_INTERVAL - 60
+        )
+        DeviceToken.objects.filter(pk=self.token.pk).update(expires=expires)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.token.refresh_from_db()
+        self.assertGreater(self.token.expires, expires)
+        with self.assertNumQueries(0):
+            self.client.get(ME_URL)
+
+    def test_cached_token_expired_rechecked(self):
+        """Test a cached copy of a token renewed since is looked up again"""
+        self.client.get(ME_URL)
+        token = cache.get(f'auth-token:{self.token.key}')
+        token.expires = timezone.now() - timedelta(seconds=1)
+        cache.set(f'auth-token:{self.token.key}', token)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+@override_settings(AUTH_TOKEN_MODE='signed')
+class SignedTokenAuthenticationTests(TestCase):
+    """Test authenticating requests with signed tokens"""
+
+    def setUp(self):
+        cache.clear()
+        caches[settings.SIGNED_TOKEN_REVOCATION_CACHE_ALIAS].clear()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123456',
+            name='Test Name'
+        )
+        self.token, _ = sign_token(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def test_authenticated_without_queries(self):
+        """Test a signed token is verified without the database"""
+        request = APIRequestFactory().get(
+            TAGS_URL,
+            HTTP_AUTHORIZATION=f'Token {self.token}'
+        )
+
+        with self.assertNumQueries(0):
+            user, token = SignedTokenAuthentication().authenticate(request)
+
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(token, self.token)
+
+    def test_recipe_views_accept_signed_tokens(self):
+        """Test signed tokens authenticate the recipe viewsets"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([tag['name'] for tag in res.data['results']],
+                         ['Vegan'])
+
+    def test_profile_loaded_for_signed_tokens(self):
+        """Test the user profile is served to signed tokens"""
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_tampered_token_rejected(self):
+        """Test a token whose payload changed is rejected"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token x{self.token}')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(SIGNED_TOKEN_TTL=-1)
+    def test_expired_token_rejected(self):
+        """Test a signed token is rejected once expired"""
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoked_token_rejected(self):
+        """Test a revoked token is rejected, the others still accepted"""
+        other, _ = sign_token(self.user)
+
+        res = self.client.post(REVOKE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {other}')
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_tokens_revoked_on_password_change(self):
+        """Test the tokens issued before a password change are rejected"""
+        self.user.set_password('new password')
+        self.user.save()
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        token, _ = sign_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_tokens_revoked_on_deactivation(self):
+        """Test the tokens of a deactivated user are rejected"""
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_keeps_tokens(self):
+        """Test updating the profile does not revoke the tokens"""
+        self.client.patch(ME_URL, {'name': 'New Name'})
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_revocation_outlives_other_cache_entries(self):
+        """Test a revocation holds once the caches filled up"""
+        self.client.post(REVOKE_URL)
+        revocations = caches[settings.SIGNED_TOKEN_REVOCATION_CACHE_ALIAS]
+        for i in range(400):
+            cache.set(f'filler-{i}', i)
+            revocations.set(f'filler-{i}', i)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_signed_tokens_ignored_in_db_mode(self):
+        """Test signed tokens are only accepted in the signed mode"""
+        with self.settings(AUTH_TOKEN_MODE='db'):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_per_process_revocation_cache_refused(self):
+        """Test the signed mode refuses a per-process revocation cache"""
+        with self.assertRaises(ImproperlyConfigured):
+            check_revocation_cache()
+
+        caches_setting = {
+            **settings.CACHES,
+            settings.SIGNED_TOKEN_REVOCATION_CACHE_ALIAS: {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': '/tmp/token-revocations',
+            },
+        }
+        with self.settings(CACHES=caches_setting):
+            check_revocation_cache()
+        with self.settings(AUTH_TOKEN_MODE='db'):
+            check_revocation_cache()
@@ -1,23 +1,284 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
+
+from core.models import DeviceToken, Recipe, Tag, Ingredient
 
 
 class CommandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         """Test waiting for db being available"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+        with patch('django.db.backends.base.base.BaseDatabaseWrapper.'
+                   'ensure_connection') as ec:
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(ec.call_count, 1)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
-        """Test waiting for db"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+        """Test waiting for db, backing off between attempts"""
+        with patch('django.db.backends.base.base.BaseDatabaseWrapper.'
+                   'ensure_connection') as ec:
+            ec.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', max_delay=1, stdout=StringIO())
+            self.assertEqual(ec.call_count, 6)
+        self.assertEqual(
+            [call.args[0] for call in ts.call_args_list],
+            [0.1, 0.2, 0.4, 0.8, 1]
+        )
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """Test waiting for db fails once the timeout is reached"""
+        with patch('django.db.backends.base.base.BaseDatabaseWrapper.'
+                   'ensure_connection', side_effect=OperationalError):
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', timeout=0, stdout=StringIO())
+
+
+class PurgeTokensCommandTests(TestCase):
+
+    def test_purge_expired_tokens(self):
+        """Test the expired tokens are deleted, batch by batch"""
+        user = get_user_model().objects.create_user('test@test.com', 'pass')
+        for i in range(5):
+            DeviceToken.objects.issue(user, f'old {i}')
+        DeviceToken.objects.update(expires=timezone.now())
+        valid = DeviceToken.objects.issue(user, 'phone')
+        out = StringIO()
+
+        with patch('core.management.commands.purge_tokens.time.sleep') as ts:
+            call_command('purge_tokens', batch_size=2, pause=1, stdout=out)
+
+        self.assertEqual(list(DeviceToken.objects.all()), [valid])
+        self.assertEqual(ts.call_count, 2)
+        self.assertIn('Deleted 5 expired tokens', out.getvalue())
+
+
+class ImportRecipesCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123456'
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, name, content):
+        """Write a file in the temporary directory and return its path"""
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def _ndjson(self, count):
+        """Return a NDJSON file holding count recipes"""
+        return self._write('recipes.ndjson', ''.join(
+            json.dumps({
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [{'id': 1, 'name': 'Vegan'}, 'Tag {}'.format(i % 2)],
+                'ingredients': ['Salt'],
+            }) + '\n'
+            for i in range(count)
+        ))
+
+    def test_import_ndjson(self):
+        """Test importing recipes reuses tags and ingredients by name"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        path = self._ndjson(5)
+
+        call_command('import_recipes', path, user=self.user.email,
+                     batch_size=2, stdout=StringIO())
+
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 5)
+        self.assertEqual(
+            sorted(Tag.objects.values_list('name', flat=True)),
+            ['Tag 0', 'Tag 1', 'Vegan']
+        )
+        self.assertEqual(Ingredient.objects.count(), 1)
+        recipe = recipes.get(title='Recipe 3')
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['Tag 1', 'Vegan']
+        )
+
+    def test_import_csv(self):
+        """Test importing recipes from a CSV file"""
+        path = self._write(
+            'recipes.csv',
+            'title,time_minutes,price,link,tags,ingredients\n'
+            'Curry,30,7.50,,Vegan|Spicy,Rice|Curry powder\n'
+            'Toast,2,1.00,http://toast,,Bread\n'
+        )
+
+        call_command('import_recipes', path, user=self.user.email,
+                     stdout=StringIO())
+
+        curry = Recipe.objects.get(title='Curry')
+        self.assertEqual(curry.tags.count(), 2)
+        self.assertEqual(curry.ingredients.count(), 2)
+        toast = Recipe.objects.get(title='Toast')
+        self.assertEqual(toast.link, 'http://toast')
+        self.assertEqual(toast.tags.count(), 0)
+
+    def test_import_resumes_from_checkpoint(self):
+        """Test the import skips the rows recorded in the checkpoint"""
+        path = self._ndjson(5)
+        checkpoint = self._write('checkpoint', '3')
+
+        call_command('import_recipes', path, user=self.user.email,
+                     checkpoint=checkpoint, stdout=StringIO())
+
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('title', flat=True)),
+            ['Recipe 3', 'Recipe 4']
+        )
+        with open(checkpoint) as file:
+            self.assertEqual(file.read(), '5')
+
+    def test_import_invalid_row(self):
+        """Test an invalid row stops the import and names the row"""
+        path = self._write(
+            'recipes.ndjson',
+            json.dumps({'title': 'No price', 'time_minutes': 1}) + '\n'
+        )
+
+        with self.assertRaisesMessage(CommandError, 'Invalid row 1'):
+            call_command('import_recipes', path, user=self.user.email,
+                         stdout=StringIO())
+
+
+class BenchmarkFiltersCommandTests(TestCase):
+    """Test the benchmark_filters command"""
+
+    def test_benchmark_filters(self):
+        """Test a timing row is reported per size and the data removed"""
+        out = StringIO()
+
+        call_command('benchmark_filters', recipes=[20, 40],
+                     filter_ids=[1, 3], repeat=1, stdout=out)
+
+        self.assertEqual(len(out.getvalue().splitlines()), 5)
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class BenchmarkApiCommandTests(TestCase):
+    """Test the benchmark_api command"""
+
+    def _benchmark(self, **options):
+        """Run a small benchmark, returning its output"""
+        out = StringIO()
+        options.setdefault('requests', 2)
+        call_command('benchmark_api', users=1, recipes=3, warmup=0,
+                     stdout=out, **options)
+
+        return out.getvalue()
+
+    def test_benchmark_api_reports_scenarios(self):
+        """Test every scenario is reported and the dataset removed"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            output = self._benchmark(save_baseline=path)
+            with open(path) as file:
+                results = json.load(file)
+
+        for name in ('login', 'recipe_list_filtered', 'image_upload'):
+            self.assertIn(name, output)
+        # Logins leave the tokens of the other scenarios working
+        self.assertEqual(
+            {name: result['errors'] for name, result in results.items()},
+            dict.fromkeys(results, 0)
+        )
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_benchmark_api_logins_unthrottled(self):
+        """Test logins are timed beyond the login rate limits"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            with self.settings(LOGIN_RATE_PER_EMAIL='1/min'):
+                self._benchmark(scenarios=['login'], requests=3,
+                                save_baseline=path)
+            with open(path) as file:
+                results = json.load(file)
+
+        self.assertEqual(results['login']['errors'], 0)
+
+    def test_benchmark_api_baseline(self):
+        """Test results are saved as a baseline and compared to one"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            self._benchmark(scenarios=['recipe_detail'], save_baseline=path)
+            with open(path) as file:
+                baseline = json.load(file)
+            self.assertEqual(baseline['recipe_detail']['errors'], 0)
+
+            baseline['recipe_detail']['queries'] = 0
+            with open(path, 'w') as file:
+                json.dump(baseline, file)
+            with self.assertRaisesMessage(CommandError, 'recipe_detail'):
+                self._benchmark(scenarios=['recipe_detail'], cold=True,
+                                baseline=path, tolerance=100)
+
+
+class BenchmarkConcurrencyCommandTests(TransactionTestCase):
+    """Test the benchmark_concurrency command"""
+
+    def test_benchmark_concurrency(self):
+        """Test both servers are reported without errors"""
+        out = StringIO()
+
+        call_command('benchmark_concurrency', users=1, recipes=3,
+                     requests=6, concurrency=2, wsgi_workers=2,
+                     client_delay_ms=0, stdout=out)
+
+        rows = out.getvalue().splitlines()[1:]
+        self.assertEqual([row.split()[0] for row in rows], ['wsgi', 'asgi'])
+        self.assertEqual([row.split()[-1] for row in rows], ['0', '0'])
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class BenchmarkSerializationCommandTests(TestCase):
+    """Test the benchmark_serialization command"""
+
+    def test_benchmark_serialization(self):
+        """Test a timing row is reported per size and the data removed"""
+        out = StringIO()
+
+        call_command('benchmark_serialization', recipes=[2, 5], repeat=1,
+                     stdout=out)
+
+        output = out.getvalue()
+        for case in ('list 2', 'list 5', 'detail x10'):
+            self.assertIn(case, output)
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class BenchmarkAuthCommandTests(TestCase):
+    """Test the benchmark_auth command"""
+
+    def test_benchmark_auth(self):
+        """Test a timing row is reported per token kind, data removed"""
+        out = StringIO()
+
+        call_command('benchmark_auth', requests=2, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split('  ')[0].strip() for line in lines[1:]],
+                         ['db', 'db cached', 'signed'])
+        self.assertFalse(get_user_model().objects.exists())
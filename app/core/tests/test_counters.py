@@ -0,0 +1,125 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core import bulk
+from core.models import Tag, Ingredient, Recipe
+
+
+def sample_recipe(user, **params):
+    """Create a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeCountTests(TestCase):
+    """Test maintaining the recipe counts of tags and ingredients"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123456'
+        )
+        self.tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        self.tag2 = Tag.objects.create(user=self.user, name='Dinner')
+        self.recipe = sample_recipe(user=self.user)
+
+    def assertCounts(self, *counts):
+        """Assert the recipe counts of the two tags"""
+        self.assertEqual(
+            [Tag.objects.get(pk=tag.pk).recipe_count
+             for tag in (self.tag1, self.tag2)],
+            list(counts)
+        )
+
+    def test_count_on_add_and_remove(self):
+        """Test adding and removing links updates the counts"""
+        self.recipe.tags.add(self.tag1, self.tag2)
+        self.recipe.tags.add(self.tag1)
+        self.assertCounts(1, 1)
+
+        self.recipe.tags.remove(self.tag1)
+        self.recipe.tags.remove(self.tag1)
+        self.assertCounts(0, 1)
+
+    def test_count_on_set_and_clear(self):
+        """Test replacing and clearing links updates the counts"""
+        self.recipe.tags.set([self.tag1])
+        self.recipe.tags.set([self.tag2])
+        self.assertCounts(0, 1)
+
+        self.recipe.tags.clear()
+        self.assertCounts(0, 0)
+
+    def test_count_on_reverse_changes(self):
+        """Test changing links from the tag side updates its count"""
+        recipe2 = sample_recipe(user=self.user, title='Other')
+        self.tag1.recipe_set.add(self.recipe, recipe2)
+        self.assertCounts(2, 0)
+
+        self.tag1.recipe_set.remove(recipe2)
+        self.assertCounts(1, 0)
+
+        self.tag1.recipe_set.clear()
+        self.assertCounts(0, 0)
+
+    def test_count_on_recipe_delete(self):
+        """Test deleting a recipe decrements the counts of its tags"""
+        self.recipe.tags.add(self.tag1)
+        sample_recipe(user=self.user).tags.add(self.tag1)
+
+        self.recipe.delete()
+
+        self.assertCounts(1, 0)
+
+    def test_count_on_bulk_writes(self):
+        """Test links written with bulk queries update the counts"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipes = bulk.create_objects(Recipe, [
+            {'user': self.user, 'title': 'Curry', 'time_minutes': 5,
+             'price': 5, 'tags': [self.tag1, self.tag2],
+             'ingredients': [ingredient]},
+            {'user': self.user, 'title': 'Salad', 'time_minutes': 5,
+             'price': 5, 'tags': [self.tag1], 'ingredients': []},
+        ])
+        self.assertCounts(2, 1)
+
+        bulk.update_objects(recipes, [{'tags': [self.tag2]}, {'tags': []}])
+
+        self.assertCounts(0, 1)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.recipe_count, 1)
+
+    def test_recount_repairs_counts(self):
+        """Test the recount command fixes counts out of sync"""
+        self.recipe.tags.add(self.tag1)
+        Tag.objects.update(recipe_count=7)
+        out = StringIO()
+
+        call_command('recount_recipes', stdout=out)
+
+        self.assertCounts(1, 0)
+        self.assertIn('Repaired 2 tags', out.getvalue())
+
+    def test_user_delete_skips_counts(self):
+        """Test deleting a user doesn't update the objects it deletes"""
+        for _ in range(3):
+            sample_recipe(user=self.user).tags.add(self.tag1, self.tag2)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.user.delete()
+
+        self.assertFalse(Tag.objects.exists())
+        self.assertFalse(any(
+            query['sql'].startswith('UPDATE') for query in queries
+        ))
@@ -0,0 +1,48 @@
+import threading
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.test import SimpleTestCase, override_settings
+
+from core import hashers
+
+
+@override_settings(PASSWORD_HASH_CONCURRENCY=1, PASSWORD_HASH_TIMEOUT=0.05)
+class HashingSlotTests(SimpleTestCase):
+
+    def _hold_slot(self):
+        """Hold the only hashing slot from another thread until released"""
+        held = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with hashers.hashing_slot():
+                held.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        held.wait(5)
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+
+    def test_hashing_waits_for_a_slot(self):
+        """Test hashing fails once no slot frees up within the timeout"""
+        self._hold_slot()
+
+        with self.assertRaises(hashers.HashingUnavailable):
+            make_password('123456')
+
+    def test_hashing_nested_in_a_slot(self):
+        """Test verifying by encoding reuses the slot of the thread"""
+        encoded = make_password('123456', hasher='pbkdf2_sha256')
+
+        self.assertTrue(check_password('123456', encoded))
+        self.assertFalse(check_password('wrong', encoded))
+
+    def test_slot_released(self):
+        """Test slots are released once hashed, even on errors"""
+        with self.assertRaises(ValueError):
+            with hashers.hashing_slot():
+                raise ValueError()
+
+        self.assertTrue(check_password('123456', make_password('123456')))
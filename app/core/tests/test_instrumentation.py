@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import instrumentation
+from core.models import Recipe
+
+from recipe import caching
+
+
+METRICS_URL = reverse('core:metrics')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def server_timing(response):
+    """Return the Server-Timing metrics of a response by name"""
+    metrics = {}
+    for metric in response['Server-Timing'].split(', '):
+        name, *params = metric.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+
+    return metrics
+
+
+class InstrumentationTests(TestCase):
+    """Test the per-request instrumentation"""
+
+    def setUp(self):
+        instrumentation.reset()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123456'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_header(self):
+        """Test responses report their time, queries and serializing"""
+        Recipe.objects.create(user=self.user, title='Curry',
+                              time_minutes=5, price=5)
+
+        res = self.client.get(RECIPES_URL)
+
+        metrics = server_timing(res)
+        self.assertEqual(set(metrics), {'app', 'db', 'serialize'})
+        self.assertEqual(metrics['db']['desc'], '"4 queries"')
+
+    def test_routes_aggregated(self):
+        """Test requests are aggregated per method and route"""
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+        self.client.get('/api/missing/')
+
+        routes = instrumentation.snapshot()['routes']
+
+        stats = routes['GET recipe:recipe-list']
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual(sum(stats['histogram'].values()), 2)
+        self.assertGreater(stats['mean_size'], 0)
+        self.assertIn('GET unresolved', routes)
+
+    @override_settings(INSTRUMENTATION_SLOW_QUERY_MS=0,
+                       INSTRUMENTATION_SLOW_QUERIES=2)
+    def test_slowest_queries_kept_with_origin(self):
+        """Test only the slowest queries are kept, with their origin"""
+        with self.assertLogs('core.instrumentation', 'WARNING'):
+            self.client.get(RECIPES_URL)
+            self.client.get(RECIPES_URL, {'search': 'curry'})
+
+        slow_queries = instrumentation.snapshot()['slow_queries']
+
+        self.assertEqual(len(slow_queries), 2)
+        self.assertGreaterEqual(slow_queries[0]['ms'], slow_queries[1]['ms'])
+        for query in slow_queries:
+            self.assertRegex(query['origin'], r'^recipe/\w+\.py:\d+ in \w+$')
+
+    def test_metrics_admin_only(self):
+        """Test the metrics are only shown to admins"""
+        self.client.get(RECIPES_URL)
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('GET recipe:recipe-list', res.data['routes'])
+        self.assertIn('db_pools', res.data)
+        self.assertEqual(set(res.data['response_cache']), {'hits', 'misses'})
+
+    def test_metrics_reset(self):
+        """Test admins can reset the metrics"""
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(RECIPES_URL)
+
+        res = self.client.delete(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            list(instrumentation.snapshot()['routes']),
+            ['DELETE core:metrics']
+        )
+        self.assertEqual(caching.stats(), {'hits': 0, 'misses': 0})
+
+    @override_settings(INSTRUMENTATION_SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        """Test the Server-Timing header can be turned off"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', res)
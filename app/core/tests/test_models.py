@@ -1,4 +1,8 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipUnless
+
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase
 from django.contrib.auth import get_user_model
 
 from unittest.mock import patch
@@ -87,3 +91,23 @@ class ModelTests(TestCase):
 
         exp_path = f'uploads/recipe/{uuid}.jpeg'
         self.assertEqual(exp_path, file_path)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Requires row locks')
+class DeviceTokenIssueTests(TransactionTestCase):
+
+    def test_concurrent_issues(self):
+        """Test concurrent logins of a device leave it a single token"""
+        user = get_user_model().objects.create_user('test@test.com', 'pass')
+
+        def issue(_):
+            try:
+                return models.DeviceToken.objects.issue(user, 'phone').key
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(8) as executor:
+            keys = list(executor.map(issue, range(32)))
+
+        token = models.DeviceToken.objects.get()
+        self.assertIn(token.key, keys)
@@ -0,0 +1,107 @@
+import threading
+from unittest.mock import Mock
+
+from django.test import SimpleTestCase
+
+from core.backends import pool
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the in-process database connection pool"""
+
+    def setUp(self):
+        self.connect = Mock(side_effect=lambda: Mock(name='connection'))
+
+    def test_connections_reused(self):
+        """Test released connections are checked out again"""
+        connections = pool.ConnectionPool(2, timeout=1)
+
+        conn = connections.acquire(self.connect)
+        connections.release(conn)
+
+        self.assertIs(connections.acquire(self.connect), conn)
+        self.assertEqual(self.connect.call_count, 1)
+        stats = connections.stats()
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_health_check_replaces_broken_connection(self):
+        """Test connections failing the checkout check are replaced"""
+        check = Mock(return_value=False)
+        connections = pool.ConnectionPool(1, timeout=1, check=check)
+        conn = connections.acquire(self.connect)
+        connections.release(conn)
+
+        new_conn = connections.acquire(self.connect)
+
+        self.assertIsNot(new_conn, conn)
+        conn.close.assert_called_once()
+        check.assert_called_once_with(conn)
+        self.assertEqual(connections.stats()['failed_checks'], 1)
+        self.assertEqual(connections.stats()['size'], 1)
+
+    def test_recently_used_connection_not_checked(self):
+        """Test connections released within check_after aren't checked"""
+        check = Mock(return_value=True)
+        connections = pool.ConnectionPool(
+            1, timeout=1, check=check, check_after=60
+        )
+        connections.release(connections.acquire(self.connect))
+
+        connections.acquire(self.connect)
+
+        check.assert_not_called()
+
+    def test_full_pool_waits_for_release(self):
+        """Test checkouts wait for a connection once the pool is full"""
+        connections = pool.ConnectionPool(1, timeout=5)
+        conn = connections.acquire(self.connect)
+        timer = threading.Timer(0.05, connections.release, [conn])
+        timer.start()
+
+        self.assertIs(connections.acquire(self.connect), conn)
+        timer.join()
+        self.assertGreater(connections.stats()['max_wait_ms'], 0)
+
+    def test_full_pool_times_out(self):
+        """Test checkouts fail when no connection is released in time"""
+        connections = pool.ConnectionPool(1, timeout=0.01)
+        connections.acquire(self.connect)
+
+        with self.assertRaises(pool.PoolTimeout):
+            connections.acquire(self.connect)
+        self.assertEqual(connections.stats()['timeouts'], 1)
+
+    def test_failed_connect_frees_slot(self):
+        """Test a failing connect doesn't use up the pool"""
+        connections = pool.ConnectionPool(1, timeout=0.01)
+
+        with self.assertRaises(OSError):
+            connections.acquire(Mock(side_effect=OSError))
+
+        self.assertIsNotNone(connections.acquire(self.connect))
+
+    def test_discarded_and_closed_connections(self):
+        """Test discarded and closed pools' connections are closed"""
+        connections = pool.ConnectionPool(2, timeout=1)
+        broken = connections.acquire(self.connect)
+        idle = connections.acquire(self.connect)
+        connections.release(broken, discard=True)
+        connections.release(idle)
+
+        connections.close()
+
+        broken.close.assert_called_once()
+        idle.close.assert_called_once()
+        self.assertEqual(connections.stats()['size'], 0)
+
+    def test_pools_replaced_when_settings_change(self):
+        """Test pools of an alias for other settings are closed"""
+        old = pool.get_pool('test', 'old', lambda: Mock())
+        new = pool.get_pool('test', 'new', lambda: Mock())
+
+        old.close.assert_called_once()
+        self.assertIs(pool.get_pool('test', 'new', Mock()), new)
+        pool.close_pools('test')
+        new.close.assert_called_once()
+        self.assertNotIn('test', pool.stats())
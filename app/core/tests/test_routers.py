@@ -0,0 +1,127 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import routers
+from core.models import Recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+ME_URL = reverse('user:me')
+
+
+@override_settings(DATABASE_REPLICAS=['replica_a', 'replica_b'],
+                   REPLICA_MAX_LAG=5)
+class ReplicaSelectionTests(SimpleTestCase):
+    """Test picking the replica to read from"""
+
+    def test_round_robin(self):
+        """Test replicas are taken in turns"""
+        picked = [routers.select_replica() for _ in range(4)]
+
+        self.assertEqual(picked[:2], picked[2:])
+        self.assertEqual(set(picked), {'replica_a', 'replica_b'})
+
+    @override_settings(REPLICA_SELECTION=routers.LEAST_LAG)
+    def test_least_lag(self):
+        """Test the least lagging replica is taken"""
+        lags = {'replica_a': 2.0, 'replica_b': 0.5}
+        with patch('core.routers.replica_lag', side_effect=lags.get):
+            self.assertEqual(routers.select_replica(), 'replica_b')
+
+    @override_settings(REPLICA_SELECTION=routers.LEAST_LAG)
+    def test_lagging_replicas_skipped(self):
+        """Test the primary is used when every replica lags too much"""
+        lags = {'replica_a': 10.0, 'replica_b': float('inf')}
+        with patch('core.routers.replica_lag', side_effect=lags.get):
+            self.assertEqual(routers.select_replica(), 'default')
+
+    def test_router_reads_from_selected_replica(self):
+        """Test only reads within replica reads are routed"""
+        router = routers.ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Recipe))
+
+        token = routers.start_replica_reads('replica_b')
+        try:
+            self.assertEqual(router.db_for_read(Recipe), 'replica_b')
+            self.assertEqual(router.db_for_write(Recipe), 'default')
+        finally:
+            routers.end_replica_reads(token)
+        self.assertIsNone(router.db_for_read(Recipe))
+
+    def test_per_process_pin_cache_refused(self):
+        """Test replicas refuse a per-process primary pin cache"""
+        with self.assertRaises(ImproperlyConfigured):
+            routers.check_pin_cache()
+
+        caches_setting = {
+            **settings.CACHES,
+            settings.REPLICA_PIN_CACHE_ALIAS: {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': '/tmp/replica-pins',
+            },
+        }
+        with self.settings(CACHES=caches_setting):
+            routers.check_pin_cache()
+        with self.settings(DATABASE_REPLICAS=[]):
+            routers.check_pin_cache()
+
+
+@override_settings(DATABASE_REPLICAS=['default'])
+class ReplicaReadMixinTests(TestCase):
+    """Test routing the requests of views to the replicas"""
+
+    def setUp(self):
+        cache.clear()
+        patcher = patch('core.routers.select_replica', return_value='default')
+        self.select_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123456'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_safe_requests_read_from_replica(self):
+        """Test listing recipes and the user read from a replica"""
+        self.client.get(RECIPES_URL)
+        self.client.get(ME_URL)
+
+        self.assertEqual(self.select_replica.call_count, 2)
+
+    def test_writes_pin_user_to_primary(self):
+        """Test users read from the primary right after writing"""
+        res = self.client.patch(ME_URL, {'name': 'New name'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.client.get(RECIPES_URL)
+
+        self.select_replica.assert_not_called()
+        self.assertTrue(routers.is_pinned(self.user.pk))
+
+    def test_pin_is_per_user(self):
+        """Test other users keep reading from the replicas"""
+        routers.pin_to_primary(self.user.pk + 1)
+
+        self.client.get(RECIPES_URL)
+
+        self.select_replica.assert_called_once()
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        """Test every request uses the primary without replicas"""
+        self.client.get(RECIPES_URL)
+        self.client.patch(ME_URL, {'name': 'New name'})
+
+        self.select_replica.assert_not_called()
+        self.assertFalse(routers.is_pinned(self.user.pk))
@@ -0,0 +1,36 @@
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import instrumentation
+from core.backends import pool
+from core.authentication import CachedTokenAuthentication
+
+from recipe import caching
+
+
+class MetricsView(APIView):
+    """Request metrics, slowest queries, pool usage and response cache hits
+
+    All of them are counted by this process alone.
+    """
+    authentication_classes = (CachedTokenAuthentication,
+                              SessionAuthentication)
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        """Return the collected metrics"""
+        return Response({
+            **instrumentation.snapshot(),
+            'db_pools': pool.stats(),
+            'response_cache': caching.stats(),
+        })
+
+    def delete(self, request):
+        """Start collecting the metrics anew"""
+        instrumentation.reset()
+        caching.reset_stats()
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
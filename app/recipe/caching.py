@@ -0,0 +1,220 @@
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+from rest_framework import status
+from rest_framework.response import Response
+
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    """Return the cache holding the responses"""
+    return caches[settings.RECIPE_RESPONSE_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    """Return the cache key of the response version of a user"""
+    return f'response-version:{user_id}'
+
+
+def user_version(user_id):
+    """Return the current response version of a user"""
+    cache = _cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), uuid.uuid4().hex, None)
+        version = cache.get(_version_key(user_id))
+
+    return version
+
+
+def bump_user_version(user_id):
+    """Invalidate every cached response of a user
+
+    Versions are random rather than incremented, so responses cached for
+    an id can't be served again once the id is reused.
+    """
+    _cache().set(_version_key(user_id), uuid.uuid4().hex, None)
+
+
+def stats():
+    """Return the number of cache hits and misses of this process"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    """Forget the cache hits and misses counted so far"""
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
+
+
+def _count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def _etag(*parts):
+    """Return a strong entity tag for the parts"""
+    return '"%s"' % hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def _not_modified(request, etag, last_modified):
+    """Return whether the client's copy matches the validators"""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        return '*' in etags or etag in etags
+
+    if_modified_since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE')
+    )
+    return bool(
+        if_modified_since and last_modified and
+        int(last_modified.timestamp()) <= if_modified_since
+    )
+
+
+class CachedResponseMixin:
+    """Cache responses per user, until the user writes
+
+    Responses carry an ETag and a Last-Modified computed from the
+    updated_at columns. They are cached along with the response data, so
+    conditional requests are answered before running the serializer,
+    and without any query when the response is cached.
+
+    The user versions invalidating the responses live in the cache too,
+    so with a per-process cache such as locmem a write is only seen by
+    the process serving it. Other processes keep answering with their
+    cached responses, 304s included, for up to
+    RECIPE_RESPONSE_CACHE_TIMEOUT. Serve with several processes only
+    with a shared cache.
+    """
+    # Whether Last-Modified changes on deletes, as If-Modified-Since
+    # can't be honoured otherwise
+    honour_if_modified_since = False
+
+    def _response_cache_key(self, request):
+        """Return the cache key of the response to the request"""
+        url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        version = user_version(request.user.pk)
+
+        return f'response:{self.basename}:{self.action}:' \
+            f'{request.user.pk}:{version}:{url}'
+
+    def get_validators(self, request):
+        """Return the ETag and last modification time of the response"""
+        raise NotImplementedError
+
+    def _respond(self, request, response, etag, last_modified):
+        """Add the validators to the response, or answer 304"""
+        if _not_modified(request, etag,
+                         last_modified if self.honour_if_modified_since
+                         else None):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        if etag:
+            response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+
+        return response
+
+    def _cached(self, handler, request, *args, **kwargs):
+        """Return the cached response data or cache the handler's"""
+        cache = _cache()
+        key = self._response_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            _count('hits')
+            etag, last_modified, data = entry
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return self._respond(request, response, etag, last_modified)
+
+        _count('misses')
+        etag, last_modified = self.get_validators(request)
+        if etag and _not_modified(
+                request, etag,
+                last_modified if self.honour_if_modified_since else None):
+            return self._respond(request, Response(), etag, last_modified)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        cache.set(key, (etag, last_modified, response.data),
+                  settings.RECIPE_RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+
+        return self._respond(request, response, etag, last_modified)
+
+
+class CachedListMixin(CachedResponseMixin):
+    """Cache the list responses"""
+
+    def get_validators(self, request):
+        """Version the list with the count and latest update of its objects"""
+        if self.action != 'list':
+            return super().get_validators(request)
+        summary = self.filter_queryset(self.get_queryset()).order_by() \
+            .aggregate(count=Count('pk'), last_modified=Max('updated_at'))
+        etag = _etag(self.basename, request.user.pk,
+                     request.get_full_path(), summary['count'],
+                     summary['last_modified'])
+
+        return etag, summary['last_modified']
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(CachedResponseMixin):
+    """Cache the retrieve responses"""
+    honour_if_modified_since = True
+
+    def get_validators(self, request):
+        """Version an object with its own and its relations' updates"""
+        if self.action != 'retrieve':
+            return super().get_validators(request)
+        model = self.queryset.model
+        # One subquery per relation, as joining them multiplies the rows
+        annotations = {}
+        for field in model._meta.many_to_many:
+            related = field.related_model.objects.filter(
+                **{field.related_query_name(): OuterRef('pk')}
+            ).order_by().values(field.related_query_name())
+            annotations[f'{field.name}_count'] = Subquery(
+                related.annotate(count=Count('pk')).values('count')
+            )
+            annotations[f'{field.name}_last_modified'] = Subquery(
+                related.annotate(last=Max('updated_at')).values('last')
+            )
+        try:
+            summary = model.objects.filter(
+                user=request.user,
+                pk=self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+            ).annotate(**annotations) \
+                .values('updated_at', *annotations).first()
+        except (TypeError, ValueError):
+            summary = None
+        if summary is None:
+            return None, None
+        last_modified = max(
+            value for key, value in summary.items()
+            if key == 'updated_at' or key.endswith('last_modified')
+            if value is not None
+        )
+        etag = _etag(self.basename, request.user.pk,
+                     request.get_full_path(), sorted(summary.items()))
+
+        return etag, last_modified
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,219 @@
+import itertools
+
+from django.contrib.postgres.aggregates import ArrayAgg, JSONBAgg
+from django.contrib.postgres.aggregates.mixins import OrderableAggMixin
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import F, Func, JSONField, OuterRef, Subquery, Value
+
+from rest_framework import serializers
+
+from core.filters import link_columns
+
+from recipe.serializers import ImageVariantField
+
+
+def aggregates_supported(queryset):
+    """Return whether the database of the queryset aggregates arrays"""
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+class OrderedJSONBAgg(OrderableAggMixin, JSONBAgg):
+    """JSONB_AGG with an ORDER BY, unsupported by JSONBAgg in Django 3.1"""
+    template = '%(function)s(%(distinct)s%(expressions)s %(ordering)s)'
+
+
+def _linked_ids(through, object_column, id_column):
+    """Return a subquery of the ids linked to the outer object, in order"""
+    return Subquery(
+        through.objects.filter(**{object_column: OuterRef('pk')})
+        .order_by().values(object_column)
+        .annotate(ids=ArrayAgg(id_column, ordering=id_column))
+        .values('ids')
+    )
+
+
+def _related_objects(field, columns):
+    """Return a subquery of the objects related to the outer object
+
+    They are aggregated, in id order, into a JSON array of objects with
+    the given columns.
+    """
+    query_name = field.related_query_name()
+    row = Func(
+        *itertools.chain.from_iterable(
+            (Value(column), F(column)) for column in columns
+        ),
+        function='JSONB_BUILD_OBJECT',
+        output_field=JSONField()
+    )
+
+    return Subquery(
+        field.related_model.objects.filter(**{query_name: OuterRef('pk')})
+        .order_by().values(query_name)
+        .annotate(objects=OrderedJSONBAgg(row, ordering='id'))
+        .values('objects')
+    )
+
+
+def annotate_related_objects(queryset, relations):
+    """Annotate the columns of the related objects, by M2M field name
+
+    Loads the relations in the same query as the objects, see
+    attach_related_objects().
+    """
+    meta = queryset.model._meta
+
+    return queryset.annotate(**{
+        f'{name}_objects': _related_objects(meta.get_field(name), columns)
+        for name, columns in relations.items()
+    })
+
+
+def attach_related_objects(obj, relations):
+    """Cache the related objects annotated on obj as if prefetched
+
+    Relations that weren't annotated are left alone.
+    """
+    for name, columns in relations.items():
+        if f'{name}_objects' not in obj.__dict__:
+            continue
+        rows = obj.__dict__.pop(f'{name}_objects') or []
+        manager = getattr(obj, name)
+        related = manager.get_queryset()
+        related._result_cache = [
+            manager.model.from_db(
+                obj._state.db,
+                columns,
+                [row[column] for column in columns]
+            )
+            for row in rows
+        ]
+        related._prefetch_done = True
+        obj.__dict__.setdefault('_prefetched_objects_cache', {})[
+            manager.prefetch_cache_name
+        ] = related
+
+
+def _converter(field):
+    """Return the function representing column values as the field does
+
+    Returns None for field types without a fast representation.
+    """
+    if isinstance(field, ImageVariantField):
+        return field.to_representation
+    if isinstance(field, serializers.DecimalField):
+        # Rounding and formatting depend on the field options
+        return field.to_representation
+    if isinstance(field, serializers.IntegerField):
+        return int
+    if isinstance(field, serializers.CharField):
+        return str
+
+    return None
+
+
+class FastSerializer:
+    """Read-only representation of values() rows, as a serializer's
+
+    Builds the same data as the serializer's to_representation(), from
+    plain column values instead of model instances and without the per
+    field machinery. Many primary key relations are aggregated into id
+    arrays by the rows query on Postgres, and read from the M2M tables
+    otherwise, one query per relation.
+    """
+
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.pk = self.model._meta.pk.attname
+        self.fields = []
+        self.relations = {}
+        for field in serializer._readable_fields:
+            if len(field.source_attrs) != 1:
+                raise TypeError(f'Unsupported source {field.source}')
+            if isinstance(field, serializers.ManyRelatedField) and \
+                    isinstance(field.child_relation,
+                               serializers.PrimaryKeyRelatedField):
+                self.relations[field.source] = link_columns(
+                    self.model._meta.get_field(field.source)
+                )
+                self.fields.append((field.field_name, field.source, None))
+                continue
+            convert = _converter(field)
+            if convert is None:
+                raise TypeError(f'Unsupported field {field.field_name}')
+            self.fields.append((field.field_name, field.source, convert))
+
+    def _has_column(self, name):
+        try:
+            return self.model._meta.get_field(name).concrete
+        except FieldDoesNotExist:
+            return False
+
+    def _ids_column(self, source):
+        return f'{source}_ids'
+
+    def rows(self, queryset, *extra, aggregate=None):
+        """Return the queryset as rows of the columns to represent
+
+        Annotations not set on the queryset are left out, as missing
+        attributes of read-only fields are. Extra columns, such as those
+        paginated by, are selected too. Relations are aggregated when
+        the database supports it, unless aggregate is False.
+        """
+        if aggregate is None:
+            aggregate = aggregates_supported(queryset)
+        if aggregate and self.relations:
+            queryset = queryset.annotate(**{
+                self._ids_column(source): _linked_ids(*link)
+                for source, link in self.relations.items()
+            })
+            extra += tuple(map(self._ids_column, self.relations))
+        annotations = queryset.query.annotations
+        columns = [self.pk]
+        for name in [source for _, source, convert in self.fields
+                     if convert is not None] + list(extra):
+            if name not in columns and \
+                    (name in annotations or self._has_column(name)):
+                columns.append(name)
+
+        return queryset.prefetch_related(None).values(*columns)
+
+    def _related_ids(self, sources, pks):
+        """Return the ids linked to each object, by relation and object"""
+        related = {}
+        for source in sources:
+            through, object_column, id_column = self.relations[source]
+            ids = related[source] = {pk: [] for pk in pks}
+            links = through.objects.filter(**{f'{object_column}__in': pks}) \
+                .order_by(id_column).values_list(object_column, id_column)
+            for pk, related_id in links:
+                ids[pk].append(related_id)
+
+        return related
+
+    def to_representation(self, rows):
+        """Return the representation of every row"""
+        sources = [
+            source for source in self.relations
+            if rows and self._ids_column(source) not in rows[0]
+        ]
+        related = self._related_ids(
+            sources,
+            [row[self.pk] for row in rows]
+        ) if sources else {}
+        data = []
+        for row in rows:
+            item = {}
+            for name, source, convert in self.fields:
+                if convert is None and source in related:
+                    item[name] = related[source][row[self.pk]]
+                elif convert is None:
+                    # Objects without links aggregate into NULL
+                    item[name] = row[self._ids_column(source)] or []
+                elif source in row:
+                    value = row[source]
+                    item[name] = None if value is None else convert(value)
+            data.append(item)
+
+        return data
@@ -0,0 +1,214 @@
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageOps, features
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import FileUploadHandler
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Formats accepted for uploads, with the extension of the re-encoded file
+UPLOAD_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+
+class ImageTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _('Image upload too large.')
+    default_code = 'image_too_large'
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """Upload handler aborting uploads larger than the image size limit"""
+
+    def receive_data_chunk(self, raw_data, start):
+        """Pass the chunk on unless the file went over the limit"""
+        if start + len(raw_data) > settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE:
+            raise ImageTooLarge()
+
+        return raw_data
+
+    def file_complete(self, file_size):
+        """Let the next handler build the uploaded file"""
+        return None
+
+
+def check_upload_size(request):
+    """Reject requests too large for an image upload before reading them"""
+    content_length = request.META.get('CONTENT_LENGTH')
+    try:
+        content_length = int(content_length or 0)
+    except ValueError:
+        content_length = 0
+    if content_length > settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE:
+        raise ImageTooLarge()
+
+    request.upload_handlers.insert(0, MaxSizeUploadHandler(request))
+
+
+def sanitize_upload(upload):
+    """Check the image limits and re-encode it without metadata
+
+    Only the header is read before the pixel count is checked, and JPEGs
+    are decoded at a reduced scale when they exceed the max dimension.
+    The re-encoded image spools to disk past FILE_UPLOAD_MAX_MEMORY_SIZE.
+    """
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError(_('Upload a valid image.'))
+    if image.format not in UPLOAD_FORMATS:
+        raise ValidationError(_('Unsupported image format.'))
+    width, height = image.size
+    if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+        raise ValidationError(_('Image has too many pixels.'))
+
+    max_size = (settings.RECIPE_IMAGE_MAX_DIMENSION,) * 2
+    image_format = image.format
+    image.draft('RGB', max_size)
+    try:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(max_size, Image.LANCZOS)
+        if image_format == 'JPEG':
+            image = image.convert('RGB')
+        output = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        image.save(output, format=image_format, quality=90)
+    except (OSError, ValueError):
+        raise ValidationError(_('Upload a valid image.'))
+    output.seek(0)
+
+    root, _ext = os.path.splitext(os.path.basename(upload.name))
+    return File(output, name=f'{root}.{UPLOAD_FORMATS[image_format]}')
+
+
+def variant_format():
+    """Return the Pillow format and extension used for the variants"""
+    if settings.RECIPE_IMAGE_VARIANT_FORMAT == 'WEBP' and \
+            features.check('webp'):
+        return 'WEBP', 'webp'
+
+    return 'JPEG', 'jpg'
+
+
+def variant_name(image_name, variant):
+    """Return the storage name of a variant of the image"""
+    root, _ = os.path.splitext(image_name)
+    _, ext = variant_format()
+
+    return f'{root}_{variant}.{ext}'
+
+
+def variant_urls(image):
+    """Return the URL of each variant of the image, keyed by variant"""
+    if not image:
+        return {}
+
+    return {
+        variant: image.storage.url(variant_name(image.name, variant))
+        for variant in settings.RECIPE_IMAGE_VARIANTS
+    }
+
+
+def generate_variants(image_name, storage=default_storage):
+    """Write the resized variants of a stored image"""
+    image_format, _ = variant_format()
+    largest = max(settings.RECIPE_IMAGE_VARIANTS.values())
+    with storage.open(image_name) as file:
+        image = Image.open(file)
+        # Let the JPEG decoder downscale while decoding when it can
+        image.draft('RGB', largest)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+    for variant, size in settings.RECIPE_IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        buffer = BytesIO()
+        resized.save(
+            buffer,
+            format=image_format,
+            quality=settings.RECIPE_IMAGE_VARIANT_QUALITY,
+            optimize=True
+        )
+        name = variant_name(image_name, variant)
+        storage.delete(name)
+        storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def _generate_variants_logged(image_name):
+    """Generate the variants, logging failures of background runs"""
+    try:
+        generate_variants(image_name)
+    except Exception:
+        logger.exception('Failed to generate variants of %s', image_name)
+
+
+def schedule_variants(image_name):
+    """Generate the variants of an image with the configured backend"""
+    global _executor
+
+    if settings.RECIPE_IMAGE_TASK_BACKEND == 'sync':
+        generate_variants(image_name)
+        return
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-images'
+            )
+    _executor.submit(_generate_variants_logged, image_name)
+
+
+def wait_for_variants():
+    """Wait until the variants scheduled so far are generated"""
+    global _executor
+
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def variant_url(image_name, variant, storage=default_storage):
+    """Return the URL of a variant of the stored image, if any"""
+    if not image_name:
+        return None
+
+    return storage.url(variant_name(image_name, variant))
+
+
+def delete_variants(image_name, storage=default_storage):
+    """Delete the stored variants of an image"""
+    for variant in settings.RECIPE_IMAGE_VARIANTS:
+        storage.delete(variant_name(image_name, variant))
+
+
+def delete_replaced(image_name, storage=default_storage):
+    """Delete an image replaced by another upload, with its variants"""
+    delete_variants(image_name, storage)
+    storage.delete(image_name)
+
+
+def delete_image(image):
+    """Delete a stored image and its variants"""
+    if not image:
+        return
+    delete_variants(image.name, image.storage)
+    image.delete(save=False)
@@ -0,0 +1,157 @@
+import json
+
+from django.conf import settings
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+def _reverse_ordering(ordering):
+    """Return the ordering with every column sorted the other way"""
+    return tuple(
+        order[1:] if order.startswith('-') else '-' + order
+        for order in ordering
+    )
+
+
+class KeysetCursorPagination(CursorPagination):
+    """Cursor pagination keyed on every column of the ordering
+
+    DRF's cursor holds the first ordering column only and pages rows
+    tying on it with a capped offset. Here the cursor holds the values
+    of the whole ordering, which must end with a unique column, so the
+    rows after it are found by comparing the row tuple and no offset is
+    ever needed.
+    """
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        self.page_size = settings.API_PAGE_SIZE
+        self.max_page_size = settings.API_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        """Return the ordering the view picked for the request, if any"""
+        get_ordering = getattr(view, 'get_pagination_ordering', None)
+        ordering = get_ordering() if get_ordering else None
+
+        return ordering or super().get_ordering(request, queryset, view)
+
+    def decode_cursor(self, request):
+        """Return the cursor of the request with its decoded position"""
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list):
+            raise NotFound(self.invalid_cursor_message)
+
+        return cursor._replace(position=position)
+
+    def encode_cursor(self, cursor):
+        """Return the url of the cursor with its position as JSON"""
+        if cursor.position is not None:
+            cursor = cursor._replace(position=json.dumps(cursor.position))
+
+        return super().encode_cursor(cursor)
+
+    def _get_position_from_instance(self, instance, ordering):
+        """Return the values of the ordering columns of the row"""
+        if isinstance(instance, dict):
+            return [instance[order.lstrip('-')] for order in ordering]
+
+        return [getattr(instance, order.lstrip('-')) for order in ordering]
+
+    def _rows_after(self, position, reverse):
+        """Return the filter of the rows following the position
+
+        The row tuple comparison is spelled out column by column, as the
+        columns may be sorted in different directions, and bounded on the
+        first column so the database can seek its index.
+        """
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        rows = Q()
+        ties = Q()
+        for order, value in zip(self.ordering, position):
+            column = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') != reverse else 'gt'
+            rows |= ties & Q(**{f'{column}__{lookup}': value})
+            ties &= Q(**{column: value})
+        first = self.ordering[0]
+        lookup = 'lte' if first.startswith('-') != reverse else 'gte'
+
+        return Q(**{f'{first.lstrip("-")}__{lookup}': position[0]}) & rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(
+                self._rows_after(current_position, reverse)
+            )
+
+        # Positions are unique, so the links never carry an offset
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+class NameCursorPagination(KeysetCursorPagination):
+    """Keyset pagination for objects listed by descending name"""
+    ordering = ('-name', '-id')
+
+
+class RecipeCursorPagination(KeysetCursorPagination):
+    """Keyset pagination for recipes listed by id"""
+    ordering = ('id',)
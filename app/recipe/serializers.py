@@ -1,29 +1,72 @@
 from rest_framework import serializers
 
+from core import bulk
+from core.instrumentation import TimedDataMixin
 from core.models import Tag, Ingredient, Recipe
 
+from recipe import images
 
-class TagSerializer(serializers.ModelSerializer):
+
+class BulkListSerializer(TimedDataMixin, serializers.ListSerializer):
+    """List serializer writing every item with bulk queries"""
+
+    def create(self, validated_data):
+        """Create all the objects and their relations"""
+        return bulk.create_objects(self.child.Meta.model, validated_data)
+
+    def update(self, instances, validated_data):
+        """Update the instances, given in the same order as the data"""
+        return bulk.update_objects(instances, validated_data)
+
+
+class TagSerializer(TimedDataMixin, serializers.ModelSerializer):
     """Serializer for Tag model"""
+    # Only output when annotated, with usage_count=1
+    usage_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Tag
-        fields = ('id', 'name')
+        fields = ('id', 'name', 'usage_count')
         read_only_fields = ('id', )
+        list_serializer_class = BulkListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedDataMixin, serializers.ModelSerializer):
     """Serializer for Ingredient model"""
+    # Only output when annotated, with usage_count=1
+    usage_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Ingredient
-        fields = ('id', 'name')
+        fields = ('id', 'name', 'usage_count')
         read_only_fields = ('id', )
+        list_serializer_class = BulkListSerializer
+
+
+class ImageVariantField(serializers.Field):
+    """Read-only URL of a variant of the image, null without an image
+
+    Represents the stored file name of values() rows as well, see
+    recipe.fast.
+    """
 
+    def __init__(self, variant, **kwargs):
+        self.variant = variant
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
 
-class RecipeSerializer(serializers.ModelSerializer):
+    def to_representation(self, value):
+        if isinstance(value, str):
+            return images.variant_url(value, self.variant)
+
+        return images.variant_url(value.name, self.variant, value.storage)
+
+
+class RecipeSerializer(TimedDataMixin, serializers.ModelSerializer):
     """Serializer for Recipe model"""
 
+    thumbnail = ImageVariantField('thumbnail', source='image')
+
     ingredients = serializers.PrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
@@ -38,9 +81,10 @@ class RecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = (
                     'id', 'title', 'ingredients', 'tags', 'time_minutes',
-                    'price', 'link',
+                    'price', 'link', 'thumbnail',
                  )
         read_only_fields = ('id',)
+        list_serializer_class = BulkListSerializer
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -48,12 +92,29 @@ class RecipeDetailSerializer(RecipeSerializer):
 
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+    image_variants = serializers.SerializerMethodField()
 
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('image_variants',)
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+    def get_image_variants(self, obj):
+        """Return the URLs of the resized variants of the image"""
+        return images.variant_urls(obj.image)
+
+
+class RecipeImageSerializer(TimedDataMixin, serializers.ModelSerializer):
     """Serializer for uploading an image to recipes"""
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'image_variants')
         read_only_fields = ('id',)
+
+    def validate_image(self, value):
+        """Check the image limits and strip its metadata"""
+        return images.sanitize_upload(value)
+
+    def get_image_variants(self, obj):
+        """Return the URLs of the resized variants of the image"""
+        return images.variant_urls(obj.image)
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+from core.signals import bulk_written
+
+from recipe import caching
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def invalidate_owner_responses(sender, instance, **kwargs):
+    """Invalidate the cached responses of the owner of a changed object"""
+    caching.bump_user_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_relinked_responses(sender, instance, action, **kwargs):
+    """Invalidate the cached responses when recipe links change"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        caching.bump_user_version(instance.user_id)
+
+
+@receiver(bulk_written)
+def invalidate_bulk_written_responses(sender, objs, **kwargs):
+    """Invalidate the cached responses of the owners of bulk writes"""
+    if sender in (Tag, Ingredient, Recipe):
+        for user_id in {obj.user_id for obj in objs}:
+            caching.bump_user_version(user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def start_new_user_responses(sender, instance, created, **kwargs):
+    """Give new users a fresh version, even if their id is reused"""
+    if created:
+        caching.bump_user_version(instance.pk)
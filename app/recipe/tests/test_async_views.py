@@ -0,0 +1,173 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase, TransactionTestCase, \
+                        override_settings
+from django.urls import resolve, reverse
+
+from rest_framework import status
+
+from core.async_views import AsyncViewsASGIHandler
+from core.models import DeviceToken, Ingredient, Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def detail_url(recipe_id):
+    """Return a recipe detail url"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@override_settings(ROOT_URLCONF='app.asgi_urls',
+                   ASYNC_VIEWS_THREAD_SENSITIVE=True)
+class AsyncViewsTests(TestCase):
+    """Test the recipe reads served by async views"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123456'
+        )
+        token = DeviceToken.objects.issue(self.user)
+        self.client = AsyncClient()
+        # Extra headers of async requests are named as sent over HTTP
+        self.auth = {'authorization': f'Token {token.key}'}
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=5.00
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        self.recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Salt')
+        )
+
+    def test_read_views_are_async(self):
+        """Test the recipe reads resolve to async views"""
+        for url in (RECIPES_URL, detail_url(self.recipe.id), TAGS_URL,
+                    INGREDIENTS_URL):
+            self.assertTrue(
+                asyncio.iscoroutinefunction(resolve(url).func),
+                url
+            )
+        self.assertFalse(
+            asyncio.iscoroutinefunction(resolve(reverse('user:me')).func)
+        )
+
+    async def test_list_and_retrieve(self):
+        """Test reads return the same data as the sync views"""
+        res = await self.client.get(RECIPES_URL, **self.auth)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['results'][0]['title'], 'Sample recipe')
+        self.assertIn('Server-Timing', res)
+
+        res = await self.client.get(detail_url(self.recipe.id), **self.auth)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['tags'][0]['name'], 'Vegan')
+
+        for url, name in ((TAGS_URL, 'Vegan'), (INGREDIENTS_URL, 'Salt')):
+            res = await self.client.get(url, **self.auth)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.json()['results'][0]['name'], name)
+
+    async def test_token_required(self):
+        """Test async views authenticate the token"""
+        res = await self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_create_recipe(self):
+        """Test writes are served by the async views too"""
+        res = await self.client.post(
+            RECIPES_URL,
+            {'title': 'Async recipe', 'time_minutes': 5, 'price': '2.00',
+             'tags': [], 'ingredients': []},
+            content_type='application/json',
+            **self.auth
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.json()['title'], 'Async recipe')
+
+
+class AsyncViewsHandlerTests(TransactionTestCase):
+    """Test requests served by the ASGI handler of the async views"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123456'
+        )
+        self.token = DeviceToken.objects.issue(self.user)
+        for title in ('First recipe', 'Second recipe'):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=10,
+                price=5.00
+            )
+            recipe.tags.add(Tag.objects.create(user=self.user, name=title))
+
+    async def _get(self, path):
+        """Serve a GET through the handler, returning status and body"""
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        await AsyncViewsASGIHandler()({
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'Token {self.token.key}'.encode()),
+            ],
+            'client': ('127.0.0.1', 0),
+            'server': ('testserver', 80),
+        }, receive, send)
+        self.assertFalse(messages[-1].get('more_body'))
+
+        return messages[0]['status'], b''.join(
+            message.get('body', b'') for message in messages[1:]
+        )
+
+    async def test_export_streamed(self):
+        """Test the streamed export queries out of the event loop"""
+        status_code, body = await self._get(reverse('recipe:recipe-export'))
+
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [json.loads(line)['title'] for line in body.splitlines()],
+            ['First recipe', 'Second recipe']
+        )
+
+    async def test_reads_in_the_pool(self):
+        """Test reads are served by the threads of the loop's pool"""
+        self.assertFalse(settings.ASYNC_VIEWS_THREAD_SENSITIVE)
+
+        status_code, body = await self._get(RECIPES_URL)
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertCountEqual(
+            [recipe['title'] for recipe in json.loads(body)['results']],
+            ['First recipe', 'Second recipe']
+        )
+
+        status_code, body = await self._get(TAGS_URL)
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(len(json.loads(body)['results']), 2)
@@ -0,0 +1,243 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+TAGS_BULK_URL = reverse('recipe:tag-bulk-create')
+INGREDIENTS_BULK_URL = reverse('recipe:ingredient-bulk-create')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk-create')
+
+
+def sample_recipe(user, **params):
+    """Create a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicBulkApiTests(TestCase):
+    """Test unauthenticated access to the bulk endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test that authentication is required"""
+        res = self.client.post(TAGS_BULK_URL, [], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBulkApiTests(TestCase):
+    """Test the authorized user bulk endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123456'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_tags(self):
+        """Test creating many tags at once"""
+        payload = [{'name': 'Vegan'}, {'name': 'Dessert'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([tag['name'] for tag in res.data],
+                         ['Vegan', 'Dessert'])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_invalid_creates_nothing(self):
+        """Test a batch with an invalid item isn't written at all"""
+        payload = [{'name': 'Salt'}, {'name': ''}]
+
+        res = self.client.post(INGREDIENTS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_bulk_create_recipes_with_relations(self):
+        """Test creating many recipes with their tags and ingredients"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        payload = [
+            {
+                'title': 'Curry',
+                'time_minutes': 30,
+                'price': '5.00',
+                'tags': [tag.id],
+                'ingredients': [ingredient.id]
+            },
+            {
+                'title': 'Salad',
+                'time_minutes': 5,
+                'price': '2.50',
+                'tags': [tag.id],
+                'ingredients': []
+            },
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['title'] for item in res.data],
+                         ['Curry', 'Salad'])
+        self.assertEqual(res.data[0]['tags'], [tag.id])
+        self.assertEqual(res.data[0]['ingredients'], [ingredient.id])
+        self.assertEqual(res.data[1]['ingredients'], [])
+        curry = Recipe.objects.get(user=self.user, title='Curry')
+        self.assertEqual(list(curry.tags.all()), [tag])
+        self.assertEqual(list(curry.ingredients.all()), [ingredient])
+
+    def test_bulk_update_recipes(self):
+        """Test partially updating many recipes at once"""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        recipe1 = sample_recipe(user=self.user, title='Curry')
+        recipe1.tags.add(tag1)
+        recipe2 = sample_recipe(user=self.user, title='Cake')
+        payload = [
+            {'id': recipe2.id, 'time_minutes': 60},
+            {'id': recipe1.id, 'title': 'Green curry', 'tags': [tag2.id]},
+        ]
+
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in res.data],
+                         [recipe2.id, recipe1.id])
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(recipe1.title, 'Green curry')
+        self.assertEqual(list(recipe1.tags.all()), [tag2])
+        self.assertEqual(recipe2.time_minutes, 60)
+
+    def test_bulk_create_ignores_list_filters(self):
+        """Test every created object is returned, whatever the filters"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(
+            f'{TAGS_BULK_URL}?assigned_only=1',
+            [{'name': 'Dessert'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['name'] for item in res.data], ['Dessert'])
+
+        res = self.client.post(
+            f'{RECIPES_BULK_URL}?search=zzz&tags={tag.id}',
+            [{'title': 'Curry', 'time_minutes': 30, 'price': '5.00',
+              'tags': [], 'ingredients': []}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['title'] for item in res.data], ['Curry'])
+
+    def test_bulk_update_ignores_list_filters(self):
+        """Test every updated object is returned, whatever the filters"""
+        recipe = sample_recipe(user=self.user, title='Curry')
+
+        res = self.client.patch(
+            f'{RECIPES_BULK_URL}?search=zzz&ingredients=1',
+            [{'id': recipe.id, 'time_minutes': 60}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['time_minutes'], 60)
+
+    def test_bulk_update_other_user_rejected(self):
+        """Test updating another user's objects is rejected"""
+        user2 = get_user_model().objects.create_user(
+            'test2@test.com',
+            '123456'
+        )
+        tag = Tag.objects.create(user=user2, name='Vegan')
+
+        res = self.client.patch(
+            TAGS_BULK_URL,
+            [{'id': tag.id, 'name': 'Changed'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegan')
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting many recipes at once"""
+        recipe1 = sample_recipe(user=self.user)
+        recipe2 = sample_recipe(user=self.user)
+        recipe3 = sample_recipe(user=self.user)
+
+        res = self.client.delete(
+            RECIPES_BULK_URL,
+            {'ids': [recipe1.id, recipe2.id]},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Recipe.objects.all()), [recipe3])
+
+    def test_bulk_delete_recipes_adjusts_counts_at_once(self):
+        """Test the queries deleting recipes don't grow with their number"""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipes = [sample_recipe(user=self.user) for _ in range(4)]
+        for recipe in recipes:
+            recipe.tags.add(tag1, tag2)
+        recipes[0].ingredients.add(ingredient)
+        recipes[3].tags.remove(tag2)
+
+        # Ids check, the counts per relation, the recipes collected and
+        # deleted with their links, and the savepoints
+        for ids in ([recipes[0].id], [recipe.id for recipe in recipes[1:]]):
+            with self.assertNumQueries(9):
+                res = self.client.delete(
+                    RECIPES_BULK_URL,
+                    {'ids': ids},
+                    format='json'
+                )
+            self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+            if len(ids) == 1:
+                self.assertEqual(
+                    [Tag.objects.get(pk=tag1.pk).recipe_count,
+                     Tag.objects.get(pk=tag2.pk).recipe_count,
+                     Ingredient.objects.get(pk=ingredient.pk).recipe_count],
+                    [3, 2, 0]
+                )
+
+        self.assertEqual(
+            list(Tag.objects.order_by('id')
+                 .values_list('recipe_count', flat=True)),
+            [0, 0]
+        )
+
+    def test_bulk_delete_invalid_ids(self):
+        """Test deleting with malformed ids deletes nothing"""
+        sample_recipe(user=self.user)
+
+        res = self.client.delete(
+            RECIPES_BULK_URL,
+            {'ids': ['abc']},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Recipe.objects.count(), 1)
@@ -0,0 +1,224 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+from recipe import caching
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk-create')
+
+
+def detail_url(recipe_id):
+    """Return a recipe detail url"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def sample_recipe(user, **params):
+    """Create a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ResponseCachingTests(TestCase):
+    """Test caching the list and retrieve responses"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123456'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test repeating a list request doesn't query the database"""
+        sample_recipe(user=self.user)
+        hits = caching.stats()['hits']
+
+        res1 = self.client.get(RECIPES_URL)
+        with self.assertNumQueries(0):
+            res2 = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res1['X-Cache'], 'MISS')
+        self.assertEqual(res2['X-Cache'], 'HIT')
+        self.assertEqual(res1.data, res2.data)
+        self.assertEqual(caching.stats()['hits'], hits + 1)
+
+    def test_cache_keyed_on_query_params(self):
+        """Test different filters aren't served the same response"""
+        recipe = sample_recipe(user=self.user, title='Tagged')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        sample_recipe(user=self.user, title='Untagged')
+
+        self.client.get(RECIPES_URL)
+        res = self.client.get(RECIPES_URL, {'tags': str(tag.id)})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(
+            [item['title'] for item in res.data['results']],
+            ['Tagged']
+        )
+
+    def test_cache_invalidated_on_write(self):
+        """Test creating an object invalidates the cached lists"""
+        self.client.get(TAGS_URL)
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_cache_invalidated_on_link_change(self):
+        """Test changing the tags of a recipe invalidates its detail"""
+        recipe = sample_recipe(user=self.user)
+        self.client.get(detail_url(recipe.id))
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        Recipe.objects.filter(pk=recipe.pk).first().tags.add(tag)
+
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['tags'], [{'id': tag.id, 'name': 'Vegan'}])
+
+    def test_cache_invalidated_on_bulk_write(self):
+        """Test bulk writes invalidate the cached lists"""
+        self.client.get(RECIPES_URL)
+        self.client.post(RECIPES_BULK_URL, [{
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': '5.00',
+            'tags': [],
+            'ingredients': []
+        }], format='json')
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_cache_per_user(self):
+        """Test users aren't served each other's cached responses"""
+        sample_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+        user2 = get_user_model().objects.create_user(
+            'test2@test.com',
+            '123456'
+        )
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'], [])
+
+
+class ConditionalRequestTests(TestCase):
+    """Test answering conditional requests with 304 Not Modified"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123456'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_validators_returned(self):
+        """Test list and detail responses carry ETag and Last-Modified"""
+        recipe = sample_recipe(user=self.user)
+
+        for url in (RECIPES_URL, detail_url(recipe.id)):
+            res = self.client.get(url)
+            self.assertTrue(res['ETag'].startswith('"'))
+            self.assertIn('Last-Modified', res)
+
+    def test_matching_etag_not_modified(self):
+        """Test a cached response is revalidated without any query"""
+        recipe = sample_recipe(user=self.user)
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(detail_url(recipe.id),
+                                  HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertFalse(res.content)
+
+    def test_not_modified_skips_serializing(self):
+        """Test an uncached response is revalidated with a single query"""
+        sample_recipe(user=self.user)
+        etag = self.client.get(RECIPES_URL)['ETag']
+        caching.bump_user_version(self.user.id)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_on_update(self):
+        """Test updating a recipe changes its ETag"""
+        recipe = sample_recipe(user=self.user)
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+        self.client.patch(detail_url(recipe.id), {'title': 'Curry'})
+
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Curry')
+
+    def test_etag_changes_on_related_rename(self):
+        """Test renaming a linked tag changes the recipe ETag"""
+        recipe = sample_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+        tag.name = 'Vegetarian'
+        tag.save()
+
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Vegetarian')
+
+    def test_list_etag_changes_on_delete(self):
+        """Test deleting a recipe changes the list ETag"""
+        sample_recipe(user=self.user)
+        recipe = sample_recipe(user=self.user)
+        etag = self.client.get(RECIPES_URL)['ETag']
+        recipe.delete()
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_if_modified_since_on_detail(self):
+        """Test If-Modified-Since is honoured on the detail"""
+        recipe = sample_recipe(user=self.user)
+        last_modified = self.client.get(detail_url(recipe.id))['Last-Modified']
+
+        res = self.client.get(detail_url(recipe.id),
+                              HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_missing_recipe_not_found(self):
+        """Test conditional requests for missing recipes return 404"""
+        res = self.client.get(detail_url(999), HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
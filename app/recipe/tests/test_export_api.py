@@ -0,0 +1,97 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.serializers import RecipeDetailSerializer
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def sample_recipe(user, **params):
+    """Create a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicExportApiTests(TestCase):
+    """Test unauthenticated access to the export endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test that authentication is required"""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateExportApiTests(TestCase):
+    """Test exporting the authenticated user's recipes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123456'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _lines(self, res):
+        """Return the decoded NDJSON lines of a streamed response"""
+        content = b''.join(res.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_export_recipes(self):
+        """Test the export holds the user's recipes with relations"""
+        recipe = sample_recipe(user=self.user, title='Crème brûlée')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Dessert'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Egg')
+        )
+        user2 = get_user_model().objects.create_user(
+            'test2@test.com',
+            '123456'
+        )
+        sample_recipe(user=user2)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        expected = json.loads(
+            json.dumps(RecipeDetailSerializer(recipe).data)
+        )
+        self.assertEqual(self._lines(res), [expected])
+
+    @override_settings(RECIPE_EXPORT_BATCH_SIZE=2)
+    def test_export_queries_per_batch(self):
+        """Test relations are loaded once per batch, not per recipe"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        for i in range(5):
+            sample_recipe(user=self.user, title=f'Recipe {i}').tags.add(tag)
+
+        with self.assertNumQueries(7):
+            res = self.client.get(EXPORT_URL)
+            lines = self._lines(res)
+
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(
+            [line['title'] for line in lines],
+            [f'Recipe {i}' for i in range(5)]
+        )
+        self.assertEqual(lines[0]['tags'], [{'id': tag.id, 'name': 'Vegan'}])
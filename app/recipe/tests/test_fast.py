@@ -0,0 +1,145 @@
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+from recipe import caching, fast
+from recipe.fast import FastSerializer
+from recipe.serializers import RecipeDetailSerializer, RecipeSerializer
+from recipe.views import FastListMixin
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class FastSerializationTests(TestCase):
+    """Test the fast list path renders what the serializers render"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123456'
+        )
+        self.client.force_authenticate(self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Dessert', 'Café  ')
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Salt', 'Kale')
+        ]
+        for i, price in enumerate(('5.5', '10.00', '0.01', '999.99')):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe ñ {i}',
+                time_minutes=i * 7,
+                price=Decimal(price),
+                link='https://example.com/' if i % 2 else '',
+                image=f'uploads/recipe/{i}.jpg' if i % 2 else ''
+            )
+            recipe.tags.set(tags[i % 3:])
+            recipe.ingredients.set(ingredients[:i % 3])
+
+    def _pages(self, url):
+        """Return the content of every page of the list"""
+        pages = []
+        while url:
+            caching.bump_user_version(self.user.pk)
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.content)
+            url = res.json().get('next')
+
+        return pages
+
+    def test_same_output_as_serializers(self):
+        """Test lists are byte identical with and without the fast path"""
+        urls = (
+            RECIPES_URL,
+            RECIPES_URL + '?page_size=3',
+            RECIPES_URL + '?search=recipe',
+            RECIPES_URL + f'?tags={Tag.objects.first().id}&match=all',
+            TAGS_URL + '?page_size=2',
+            TAGS_URL + '?usage_count=1&ordering=popular&page_size=2',
+            INGREDIENTS_URL + '?assigned_only=1&usage_count=1',
+        )
+        for url in urls:
+            with override_settings(RECIPE_FAST_SERIALIZATION=False):
+                expected = self._pages(url)
+            with patch.object(FastSerializer, 'to_representation',
+                              autospec=True,
+                              side_effect=FastSerializer.to_representation
+                              ) as fast:
+                self.assertEqual(self._pages(url), expected, url)
+            self.assertEqual(fast.call_count, len(expected), url)
+
+    def test_shared_serializers_hold_no_request(self):
+        """Test the FastSerializers kept across requests have no context"""
+        FastListMixin._fast_serializers.clear()
+
+        for url in (RECIPES_URL, TAGS_URL):
+            self.client.get(url)
+
+        self.assertEqual(len(FastListMixin._fast_serializers), 2)
+        for serializer in FastListMixin._fast_serializers.values():
+            for _, _, convert in serializer.fields:
+                field = getattr(convert, '__self__', None)
+                if field is not None:
+                    self.assertEqual(field.context, {})
+
+    def test_unsupported_serializer_falls_back(self):
+        """Test serializers with other fields aren't made fast"""
+        with self.assertRaises(TypeError):
+            FastSerializer(RecipeDetailSerializer())
+
+    def test_attach_related_objects(self):
+        """Test aggregated relations are serialized as prefetched ones"""
+        recipe = Recipe.objects.first()
+        expected = RecipeDetailSerializer(recipe).data
+        relations = {'tags': ('id', 'name'), 'ingredients': ('id', 'name')}
+        recipe = Recipe.objects.get(pk=recipe.pk)
+        recipe.tags_objects = [
+            {'id': tag.id, 'name': tag.name}
+            for tag in recipe.tags.order_by('id')
+        ]
+        recipe.ingredients_objects = None
+
+        fast.attach_related_objects(recipe, relations)
+
+        with self.assertNumQueries(0):
+            data = RecipeDetailSerializer(recipe).data
+        self.assertEqual(data['tags'], expected['tags'])
+        self.assertEqual(data['ingredients'], [])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Requires Postgres')
+class AggregatedRelationsTests(FastSerializationTests):
+    """Test relations aggregated into the objects query on Postgres"""
+
+    def test_rows_aggregate_relations(self):
+        """Test rows carry their relations without other queries"""
+        serializer = FastSerializer(RecipeSerializer())
+        recipes = Recipe.objects.order_by('id')
+        expected = serializer.to_representation(
+            list(serializer.rows(recipes, aggregate=False))
+        )
+
+        with self.assertNumQueries(1):
+            data = serializer.to_representation(
+                list(serializer.rows(recipes))
+            )
+
+        self.assertEqual(data, expected)
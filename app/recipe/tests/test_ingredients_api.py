@@ -47,7 +47,7 @@ class PrivateIngredientApiTests(TestCase):
         serializer = IngredientSerializer(ingredients, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredient_limited_to_user(self):
         """Check that ingredients for the authenticated user are returned"""
@@ -62,8 +62,8 @@ class PrivateIngredientApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], i1.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], i1.name)
 
     def test_create_ingredient_successful(self):
         """Check that ingredients are created"""
@@ -105,8 +105,8 @@ class PrivateIngredientApiTests(TestCase):
         serializer1 = IngredientSerializer(ingredient1)
         serializer2 = IngredientSerializer(ingredient2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_ingredients_assigned_unique(self):
         """Test that API returns unique items"""
@@ -131,4 +131,19 @@ class PrivateIngredientApiTests(TestCase):
 
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_retrieve_ingredients_usage_count(self):
+        """Test ingredients are counted by recipe when requested"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=5.00
+        )
+        recipe.ingredients.add(ingredient)
+
+        res = self.client.get(INGREDIENTS_URL, {'usage_count': 1})
+
+        self.assertEqual(res.data['results'][0]['usage_count'], 1)
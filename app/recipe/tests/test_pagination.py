@@ -0,0 +1,133 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class PaginationApiTests(TestCase):
+    """Test the cursor pagination of the list endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123456'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _collect(self, url, page_size, **params):
+        """Follow the next links and return every item seen"""
+        items = []
+        res = self.client.get(url, {'page_size': page_size, **params})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), page_size)
+            seen = {item['id'] for item in items}
+            self.assertFalse(
+                [item for item in res.data['results'] if item['id'] in seen]
+            )
+            items.extend(res.data['results'])
+            if not res.data['next']:
+                return items
+            res = self.client.get(res.data['next'])
+
+    def test_tags_pages_stable_with_duplicate_names(self):
+        """Test paging tags sharing a name returns each tag once"""
+        for i in range(7):
+            Tag.objects.create(user=self.user, name='Dup')
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        items = self._collect(TAGS_URL, 3)
+
+        ids = [item['id'] for item in items]
+        self.assertEqual(len(ids), 14)
+        self.assertEqual(len(set(ids)), 14)
+        names = [item['name'] for item in items]
+        self.assertEqual(names, sorted(names, reverse=True))
+
+    def test_tags_paged_past_offset_cutoff_with_duplicate_names(self):
+        """Test more tied names than DRF's offset cutoff are each seen once"""
+        Tag.objects.bulk_create(
+            Tag(user=self.user, name='Dup') for i in range(1100)
+        )
+
+        items = self._collect(TAGS_URL, 100)
+
+        ids = [item['id'] for item in items]
+        self.assertEqual(len(ids), 1100)
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_popular_tags_paged_past_offset_cutoff(self):
+        """Test more unused tags than DRF's offset cutoff are each seen once"""
+        Tag.objects.bulk_create(
+            Tag(user=self.user, name=f'Tag {i % 3}') for i in range(1300)
+        )
+        Recipe.objects.create(
+            user=self.user,
+            title='Recipe',
+            time_minutes=5,
+            price=5.00
+        ).tags.add(Tag.objects.order_by('id').last())
+
+        for fast in (True, False):
+            with self.subTest(fast=fast), \
+                    self.settings(RECIPE_FAST_SERIALIZATION=fast):
+                items = self._collect(TAGS_URL, 100, ordering='popular')
+
+                ids = [item['id'] for item in items]
+                self.assertEqual(len(ids), 1300)
+                self.assertEqual(ids[0], Tag.objects.order_by('id').last().id)
+
+    def test_tags_paged_back_with_duplicate_names(self):
+        """Test the previous links return the pages already seen"""
+        for i in range(7):
+            Tag.objects.create(user=self.user, name='Dup')
+
+        first = self.client.get(TAGS_URL, {'page_size': 3})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+
+        self.assertEqual(back.data['results'], first.data['results'])
+
+    def test_invalid_cursor(self):
+        """Test a cursor without a valid position is rejected"""
+        res = self.client.get(TAGS_URL, {'cursor': 'cD1ub3Q='})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_recipes_paged_by_id(self):
+        """Test paging recipes returns them in id order"""
+        for i in range(5):
+            Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=5,
+                price=5.00
+            )
+
+        items = self._collect(RECIPES_URL, 2)
+
+        ids = [item['id'] for item in items]
+        self.assertEqual(
+            ids,
+            list(Recipe.objects.order_by('id').values_list('id', flat=True))
+        )
+
+    @override_settings(API_MAX_PAGE_SIZE=2)
+    def test_page_size_capped(self):
+        """Test the requested page size can't exceed the cap"""
+        for i in range(4):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        res = self.client.get(TAGS_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
@@ -0,0 +1,181 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core import filters
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.views import RecipeViewSet
+
+
+USERS = 60
+PER_USER = 40
+
+
+def seed_dataset():
+    """Create a dataset large enough for the planner to prefer indexes"""
+    users = [
+        get_user_model().objects.create_user(f'user{i}@test.com', '123456')
+        for i in range(USERS)
+    ]
+    Tag.objects.bulk_create(
+        Tag(user=user, name=f'Tag {i}')
+        for user in users for i in range(PER_USER)
+    )
+    Ingredient.objects.bulk_create(
+        Ingredient(user=user, name=f'Ingredient {i}')
+        for user in users for i in range(PER_USER)
+    )
+    Recipe.objects.bulk_create(
+        Recipe(user=user, title=f'Recipe {i}', time_minutes=5, price=5)
+        for user in users for i in range(PER_USER)
+    )
+
+    tags = {}
+    for tag_id, user_id in Tag.objects.values_list('id', 'user_id'):
+        tags.setdefault(user_id, []).append(tag_id)
+    ingredients = {}
+    for ingredient_id, user_id in Ingredient.objects.values_list(
+            'id', 'user_id'):
+        ingredients.setdefault(user_id, []).append(ingredient_id)
+
+    recipe_tags = []
+    recipe_ingredients = []
+    for i, (recipe_id, user_id) in enumerate(
+            Recipe.objects.values_list('id', 'user_id')):
+        for offset in range(3):
+            tag_id = tags[user_id][(i + offset) % PER_USER]
+            ingredient_id = ingredients[user_id][(i + offset) % PER_USER]
+            recipe_tags.append(
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            )
+            recipe_ingredients.append(
+                Recipe.ingredients.through(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id
+                )
+            )
+    Recipe.tags.through.objects.bulk_create(recipe_tags)
+    Recipe.ingredients.through.objects.bulk_create(recipe_ingredients)
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    return users
+
+
+def recipe_list(user, **params):
+    """Return the page query the recipe list view runs for the params"""
+    request = APIRequestFactory().get('/api/recipe/recipes/', params)
+    force_authenticate(request, user)
+    view = RecipeViewSet(
+        action_map={'get': 'list'}, kwargs={}, format_kwarg=None
+    )
+    view.request = view.initialize_request(request)
+
+    return view.get_queryset().order_by('id')[:101]
+
+
+def sequential_scans(plan, tables):
+    """Return the tables of the given ones that the plan scans in full"""
+    if connection.vendor == 'postgresql':
+        pattern = r'Seq Scan on {}\b'
+    else:
+        pattern = r'\bSCAN (?:TABLE )?{}\b(?! USING)'
+
+    return [
+        table for table in tables
+        if re.search(pattern.format(re.escape(table)), plan)
+    ]
+
+
+class QueryPlanTests(TestCase):
+    """Test the hot queries are served from indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_dataset()[USERS // 2]
+
+    def assertUsesIndexes(self, queryset, *tables):
+        """Assert the queryset plan doesn't scan the tables in full"""
+        plan = queryset.explain()
+        self.assertEqual(sequential_scans(plan, tables), [], plan)
+
+    def test_tags_by_user_ordered_by_name(self):
+        """Test listing a user's tags uses the (user, name) index"""
+        queryset = Tag.objects.filter(
+            user=self.user
+        ).order_by('-name', '-id')[:101]
+
+        self.assertUsesIndexes(queryset, 'core_tag')
+
+    def test_ingredients_by_user_ordered_by_name(self):
+        """Test listing a user's ingredients uses the (user, name) index"""
+        queryset = Ingredient.objects.filter(
+            user=self.user
+        ).order_by('-name', '-id')[:101]
+
+        self.assertUsesIndexes(queryset, 'core_ingredient')
+
+    def test_recipes_by_user_ordered_by_id(self):
+        """Test listing a user's recipes uses the (user, id) index"""
+        queryset = Recipe.objects.filter(user=self.user).order_by('id')[:101]
+
+        self.assertUsesIndexes(queryset, 'core_recipe')
+
+    def assertFiltersUseIndexes(self, field, related_ids):
+        """Assert the view filters by the field in any mode using indexes"""
+        ids = '|'.join(str(related_id) for related_id in related_ids)
+        for match in filters.MATCH_MODES:
+            with self.subTest(match=match):
+                self.assertUsesIndexes(
+                    recipe_list(self.user, **{field: ids, 'match': match}),
+                    'core_recipe',
+                    f'core_recipe_{field}'
+                )
+
+    def test_recipes_filtered_by_tags(self):
+        """Test filtering recipes by tag uses the reverse M2M index"""
+        tag_ids = list(
+            Tag.objects.filter(user=self.user).values_list('id', flat=True)
+        )[:2]
+
+        self.assertFiltersUseIndexes('tags', tag_ids)
+
+    def test_recipes_filtered_by_ingredients(self):
+        """Test filtering recipes by ingredient uses the reverse M2M index"""
+        ingredient_ids = list(
+            Ingredient.objects.filter(
+                user=self.user
+            ).values_list('id', flat=True)
+        )[:2]
+
+        self.assertFiltersUseIndexes('ingredients', ingredient_ids)
+
+    def test_recipes_filtered_by_tags_and_ingredients(self):
+        """Test combining both filters keeps every table on an index"""
+        tag = Tag.objects.filter(user=self.user).first()
+        ingredient = Ingredient.objects.filter(user=self.user).first()
+        queryset = recipe_list(
+            self.user, tags=str(tag.id), ingredients=str(ingredient.id)
+        )
+
+        self.assertUsesIndexes(
+            queryset,
+            'core_recipe',
+            'core_recipe_tags',
+            'core_recipe_ingredients'
+        )
+
+    def test_assigned_tags_use_link_index(self):
+        """Test the assigned_only semi-join uses the (tag, recipe) index"""
+        queryset = filters.filter_linked(
+            Tag.objects.filter(user=self.user),
+            Recipe._meta.get_field('tags')
+        ).order_by('-name', '-id')[:101]
+
+        self.assertUsesIndexes(queryset, 'core_tag', 'core_recipe_tags')
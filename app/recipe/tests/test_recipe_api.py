@@ -3,8 +3,9 @@ import os
 
 from PIL import Image
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
@@ -12,6 +13,7 @@ from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
 
+from recipe import images
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 
@@ -85,7 +87,7 @@ class PrivateRecipeAPITests(TestCase):
         recipes = Recipe.objects.all()
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_limited_to_user(self):
         """Test retrieving recipes for user"""
@@ -101,7 +103,7 @@ class PrivateRecipeAPITests(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         """Test viewing a recipe detail"""
@@ -229,9 +231,9 @@ class PrivateRecipeAPITests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """Test returning recipes filtered by tag"""
@@ -254,11 +256,65 @@ class PrivateRecipeAPITests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+    def test_filter_recipes_not_repeated(self):
+        """Test recipes matching several filter ids are returned once"""
+        recipe = sample_recipe(user=self.user)
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Dinner')
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{tag1.id}|{tag2.id}'})
+
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [recipe.id]
+        )
+
+    def test_filter_recipes_matching_all_tags(self):
+        """Test match=all returns only recipes with every tag"""
+        recipe1 = sample_recipe(user=self.user, title='Vegan Curry')
+        recipe2 = sample_recipe(user=self.user, title='Vegan Salad')
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Dinner')
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag1)
+        ingredient = sample_ingredient(user=self.user, name='Rice')
+        recipe1.ingredients.add(ingredient)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': f'{tag1.id}|{tag2.id}|{tag1.id}', 'match': 'all'}
+        )
+        res_ingredients = self.client.get(
+            RECIPES_URL,
+            {'tags': str(tag1.id), 'ingredients': str(ingredient.id),
+             'match': 'all'}
+        )
+
+        self.assertEqual(
+            [item['title'] for item in res.data['results']],
+            ['Vegan Curry']
+        )
+        self.assertEqual(
+            [item['title'] for item in res_ingredients.data['results']],
+            ['Vegan Curry']
+        )
+
+    def test_filter_recipes_invalid_params(self):
+        """Test invalid filter ids or match modes are rejected"""
+        res_match = self.client.get(RECIPES_URL,
+                                    {'tags': '1', 'match': 'some'})
+        res_ids = self.client.get(RECIPES_URL, {'tags': '1|a'})
+
+        self.assertEqual(res_match.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res_ids.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+@override_settings(RECIPE_IMAGE_TASK_BACKEND='sync')
 class RecipeImageUploadTest(TestCase):
 
     def setUp(self):
@@ -271,6 +327,12 @@ class RecipeImageUploadTest(TestCase):
         self.recipe = sample_recipe(user=self.user)
 
     def tearDown(self):
+        if self.recipe.image:
+            for variant in settings.RECIPE_IMAGE_VARIANTS:
+                self.recipe.image.storage.delete(images.variant_name(
+                    self.recipe.image.name,
+                    variant
+                ))
         self.recipe.image.delete()
 
     def test_upload_image_to_recipe(self):
@@ -287,6 +349,135 @@ class RecipeImageUploadTest(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def test_upload_image_generates_variants(self):
+        """Test uploading an image writes its resized variants"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            img = Image.new('RGB', (800, 400))
+            img.save(ntf, format='JPEG')
+            ntf.seek(0)
+            res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            set(res.data['image_variants']),
+            {'thumbnail', 'medium', 'large'}
+        )
+        storage = self.recipe.image.storage
+        thumbnail = images.variant_name(self.recipe.image.name, 'thumbnail')
+        self.assertTrue(storage.exists(thumbnail))
+        with storage.open(thumbnail) as file:
+            self.assertEqual(Image.open(file).size, (150, 75))
+        medium = images.variant_name(self.recipe.image.name, 'medium')
+        with storage.open(medium) as file:
+            self.assertEqual(Image.open(file).size, (600, 300))
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(
+            res.data['image_variants']['thumbnail'],
+            storage.url(thumbnail)
+        )
+
+    def test_upload_image_changes_etag(self):
+        """Test uploading an image invalidates the cached detail"""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        self._upload(Image.new('RGB', (10, 10)))
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertTrue(res.data['image_variants'])
+
+    def test_list_shows_thumbnail(self):
+        """Test the list links the thumbnail variant of the images"""
+        sample_recipe(user=self.user, title='No image')
+        self._upload(Image.new('RGB', (10, 10)))
+        self.recipe.refresh_from_db()
+
+        res = self.client.get(RECIPES_URL)
+
+        thumbnails = {
+            recipe['title']: recipe['thumbnail']
+            for recipe in res.data['results']
+        }
+        self.assertEqual(thumbnails, {
+            'No image': None,
+            self.recipe.title: self.recipe.image.storage.url(
+                images.variant_name(self.recipe.image.name, 'thumbnail')
+            ),
+        })
+
+    def test_replacing_image_deletes_previous_files(self):
+        """Test uploading a new image deletes the previous one's files"""
+        self._upload(Image.new('RGB', (10, 10)))
+        self.recipe.refresh_from_db()
+        storage = self.recipe.image.storage
+        previous = [self.recipe.image.name] + [
+            images.variant_name(self.recipe.image.name, variant)
+            for variant in settings.RECIPE_IMAGE_VARIANTS
+        ]
+        self.assertTrue(all(map(storage.exists, previous)))
+
+        self._upload(Image.new('RGB', (20, 20)))
+        self.recipe.refresh_from_db()
+
+        self.assertNotIn(self.recipe.image.name, previous)
+        self.assertFalse(any(map(storage.exists, previous)))
+        self.assertTrue(storage.exists(images.variant_name(
+            self.recipe.image.name,
+            'thumbnail'
+        )))
+
+    def _upload(self, img, **save_kwargs):
+        """Upload the image to the recipe as a JPEG"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            img.save(ntf, format='JPEG', **save_kwargs)
+            ntf.seek(0)
+            return self.client.post(url, {'image': ntf}, format='multipart')
+
+    @override_settings(RECIPE_IMAGE_MAX_UPLOAD_SIZE=2000)
+    def test_upload_image_too_large(self):
+        """Test uploads over the size limit are rejected"""
+        img = Image.effect_noise((200, 200), 100).convert('RGB')
+
+        res = self._upload(img)
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=100)
+    def test_upload_image_too_many_pixels(self):
+        """Test images over the pixel limit are rejected"""
+        res = self._upload(Image.new('RGB', (20, 20)))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_MAX_DIMENSION=50)
+    def test_upload_image_reencoded(self):
+        """Test uploads are downscaled and stripped of their metadata"""
+        img = Image.new('RGB', (200, 100))
+        exif = Image.Exif()
+        exif[0x010f] = 'Camera maker'
+
+        res = self._upload(img, exif=exif.tobytes())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        with self.recipe.image.open() as file:
+            stored = Image.open(file)
+            self.assertEqual(stored.size, (50, 25))
+            self.assertNotIn('exif', stored.info)
+
     def test_upload_invalid_image(self):
         """Test uploading invalid image"""
         url = image_upload_url(self.recipe.id)
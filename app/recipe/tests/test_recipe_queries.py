@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+# Postgres aggregates the tags and ingredients into the recipes query
+RELATION_QUERIES = 0 if connection.vendor == 'postgresql' else 2
+
+
+def detail_url(recipe_id):
+    """Return a recipe detail url"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def seed_recipes(user, count, tags=2, ingredients=2):
+    """Create recipes with tags and ingredients attached"""
+    tag_objs = [
+        Tag.objects.create(user=user, name=f'Tag {i}') for i in range(tags)
+    ]
+    ingredient_objs = [
+        Ingredient.objects.create(user=user, name=f'Ingredient {i}')
+        for i in range(ingredients)
+    ]
+    recipes = []
+    for i in range(count):
+        recipe = Recipe.objects.create(
+            user=user,
+            title=f'Recipe {i}',
+            time_minutes=10,
+            price=5.00
+        )
+        recipe.tags.add(*tag_objs)
+        recipe.ingredients.add(*ingredient_objs)
+        recipes.append(recipe)
+
+    return recipes
+
+
+class RecipeQueryCountTests(TestCase):
+    """Test that the number of queries doesn't grow with the result size"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123456'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_recipes_constant_queries(self):
+        """Test listing recipes costs the same for few and many recipes"""
+        # Recipes, tags and ingredients, after the ETag query
+        seed_recipes(self.user, 2)
+        with self.assertNumQueries(2 + RELATION_QUERIES):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        seed_recipes(self.user, 20)
+        with self.assertNumQueries(2 + RELATION_QUERIES):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 22)
+
+    def test_list_recipes_relations_loaded(self):
+        """Test the prefetched relations are returned in the list"""
+        recipe = seed_recipes(self.user, 1, tags=3, ingredients=2)[0]
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(
+            res.data['results'][0]['tags'],
+            sorted(tag.id for tag in recipe.tags.all())
+        )
+        self.assertEqual(
+            res.data['results'][0]['ingredients'],
+            sorted(ingredient.id for ingredient in recipe.ingredients.all())
+        )
+
+    def test_retrieve_recipe_constant_queries(self):
+        """Test retrieving a recipe doesn't query per related object"""
+        recipe = seed_recipes(self.user, 1, tags=10, ingredients=10)[0]
+
+        with self.assertNumQueries(2 + RELATION_QUERIES):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 10)
+        self.assertEqual(len(res.data['ingredients']), 10)
+
+    def test_list_tags_single_query(self):
+        """Test listing tags is a single query after the ETag query"""
+        seed_recipes(self.user, 1, tags=15)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data['results']), 15)
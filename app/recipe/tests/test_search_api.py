@@ -0,0 +1,171 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import search
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_BULK_URL = reverse('recipe:tag-bulk-create')
+INGREDIENTS_BULK_URL = reverse('recipe:ingredient-bulk-create')
+
+
+def sample_recipe(user, **params):
+    """Create a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeSearchApiTests(TestCase):
+    """Test searching the authenticated user's recipes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123456'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _search(self, text):
+        """Return the titles of the recipes found for the text"""
+        res = self.client.get(RECIPES_URL, {'search': text})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_search_by_title(self):
+        """Test searching recipes by a word of their title"""
+        sample_recipe(user=self.user, title='Vegan Curry')
+        sample_recipe(user=self.user, title='Fish and Chips')
+
+        self.assertEqual(self._search('curry'), ['Vegan Curry'])
+
+    def test_search_by_tag_and_ingredient_names(self):
+        """Test searching recipes by their tag and ingredient names"""
+        recipe1 = sample_recipe(user=self.user, title='Pancakes')
+        recipe1.tags.add(Tag.objects.create(user=self.user, name='Breakfast'))
+        recipe2 = sample_recipe(user=self.user, title='Omelette')
+        recipe2.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Mushrooms')
+        )
+        sample_recipe(user=self.user, title='Steak')
+
+        self.assertEqual(self._search('breakfast'), ['Pancakes'])
+        self.assertEqual(self._search('mushrooms'), ['Omelette'])
+
+    def test_search_limited_to_user(self):
+        """Test other users' recipes aren't found"""
+        user2 = get_user_model().objects.create_user(
+            'test2@test.com',
+            '123456'
+        )
+        sample_recipe(user=user2, title='Vegan Curry')
+
+        self.assertEqual(self._search('curry'), [])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Requires Postgres')
+class PostgresRecipeSearchTests(RecipeSearchApiTests):
+    """Test the ranked full-text search"""
+
+    def test_search_ranks_title_over_tags(self):
+        """Test title matches rank above tag matches"""
+        tagged = sample_recipe(user=self.user, title='Stew')
+        tagged.tags.add(Tag.objects.create(user=self.user, name='Chicken'))
+        sample_recipe(user=self.user, title='Chicken soup')
+
+        self.assertEqual(self._search('chicken'), ['Chicken soup', 'Stew'])
+
+    def test_search_by_prefix(self):
+        """Test words are matched by prefix"""
+        sample_recipe(user=self.user, title='Chocolate cake')
+
+        self.assertEqual(self._search('choco'), ['Chocolate cake'])
+
+    def test_search_tolerates_typos(self):
+        """Test the title trigram fallback matches misspelled words"""
+        sample_recipe(user=self.user, title='Lasagna')
+
+        self.assertEqual(self._search('lasagne'), ['Lasagna'])
+
+    def test_search_vector_follows_renames(self):
+        """Test renaming a tag updates the recipes search vectors"""
+        recipe = sample_recipe(user=self.user, title='Stew')
+        tag = Tag.objects.create(user=self.user, name='Winter')
+        recipe.tags.add(tag)
+        tag.name = 'Comfort'
+        tag.save()
+
+        self.assertEqual(self._search('comfort'), ['Stew'])
+        self.assertEqual(self._search('winter'), [])
+
+    def test_search_vector_follows_deletes(self):
+        """Test deleting an ingredient updates the recipes search vectors"""
+        recipe = sample_recipe(user=self.user, title='Stew')
+        ingredient = Ingredient.objects.create(user=self.user, name='Garlic')
+        recipe.ingredients.add(ingredient)
+        self.assertEqual(self._search('garlic'), ['Stew'])
+
+        ingredient.delete()
+
+        self.assertEqual(self._search('garlic'), [])
+        self.assertEqual(self._search('stew'), ['Stew'])
+
+    def test_search_vector_follows_bulk_renames(self):
+        """Test bulk renaming tags and ingredients reindexes their recipes"""
+        recipe = sample_recipe(user=self.user, title='Stew')
+        tag = Tag.objects.create(user=self.user, name='Winter')
+        ingredient = Ingredient.objects.create(user=self.user, name='Garlic')
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+
+        self.client.patch(
+            TAGS_BULK_URL,
+            [{'id': tag.id, 'name': 'Comfort'}],
+            format='json'
+        )
+        self.client.patch(
+            INGREDIENTS_BULK_URL,
+            [{'id': ingredient.id, 'name': 'Onion'}],
+            format='json'
+        )
+
+        self.assertEqual(self._search('comfort'), ['Stew'])
+        self.assertEqual(self._search('onion'), ['Stew'])
+        self.assertEqual(self._search('winter'), [])
+        self.assertEqual(self._search('garlic'), [])
+
+    def test_search_paged_past_offset_cutoff(self):
+        """Test more equally ranked results than DRF's offset cutoff"""
+        Recipe.objects.bulk_create(
+            Recipe(user=self.user, title='Stew', time_minutes=5, price=5)
+            for i in range(1100)
+        )
+        search.update_search_vectors(
+            Recipe.objects.values_list('pk', flat=True)
+        )
+
+        ids = []
+        res = self.client.get(RECIPES_URL, {'search': 'stew',
+                                            'page_size': 100})
+        while True:
+            ids.extend(recipe['id'] for recipe in res.data['results'])
+            self.assertEqual(len(ids), len(set(ids)))
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(len(ids), 1100)
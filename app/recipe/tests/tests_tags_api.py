@@ -48,7 +48,7 @@ class PrivateTagsApiTests(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_retrieve_my_tags(self):
         """Test that tags returned are for the authenticated user"""
@@ -62,8 +62,8 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag2.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag2.name)
 
     def test_create_tags_successful(self):
         """Test creating a new tag"""
@@ -100,8 +100,8 @@ class PrivateTagsApiTests(TestCase):
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_tags_assigned_unique(self):
         """Test that API returns unique items"""
@@ -124,4 +124,93 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_retrieve_tags_usage_count(self):
+        """Test tags are counted by recipe when requested"""
+        tag1 = Tag.objects.create(user=self.user, name='Tag 1')
+        Tag.objects.create(user=self.user, name='Tag 2')
+        for title in ('Recipe 1', 'Recipe 2'):
+            Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=10,
+                price=5.00
+            ).tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {'usage_count': 1})
+        res_default = self.client.get(TAGS_URL)
+
+        self.assertEqual(
+            [(tag['name'], tag['usage_count']) for tag in res.data['results']],
+            [('Tag 2', 0), ('Tag 1', 2)]
+        )
+        self.assertNotIn('usage_count', res_default.data['results'][0])
+
+    def test_usage_count_single_query(self):
+        """Test usage counts are loaded without a query per tag"""
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=5.00
+        )
+        for i in range(10):
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+
+        # The ETag query and the page query
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                TAGS_URL,
+                {'usage_count': 1, 'assigned_only': 1}
+            )
+
+        self.assertEqual(len(res.data['results']), 10)
+
+    def test_usage_count_etag_follows_links(self):
+        """Test linking a tag changes the ETag of the counted list"""
+        tag = Tag.objects.create(user=self.user, name='Tag 1')
+        res = self.client.get(TAGS_URL, {'usage_count': 1})
+        Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=5.00
+        ).tags.add(tag)
+
+        res = self.client.get(
+            TAGS_URL,
+            {'usage_count': 1},
+            HTTP_IF_NONE_MATCH=res['ETag']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['usage_count'], 1)
+
+    def test_retrieve_tags_popular_first(self):
+        """Test ordering=popular lists the most used tags first"""
+        tag1 = Tag.objects.create(user=self.user, name='Tag 1')
+        tag2 = Tag.objects.create(user=self.user, name='Tag 2')
+        Tag.objects.create(user=self.user, name='Tag 3')
+        for title in ('Recipe 1', 'Recipe 2'):
+            Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=10,
+                price=5.00
+            ).tags.add(tag1)
+        Recipe.objects.create(
+            user=self.user,
+            title='Recipe 3',
+            time_minutes=10,
+            price=5.00
+        ).tags.add(tag2)
+
+        res = self.client.get(TAGS_URL, {'ordering': 'popular'})
+        res_invalid = self.client.get(TAGS_URL, {'ordering': 'count'})
+
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['Tag 1', 'Tag 2', 'Tag 3']
+        )
+        self.assertEqual(res_invalid.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,34 +1,219 @@
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Prefetch, prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
+
 from rest_framework import viewsets, mixins, status
+from rest_framework import serializers as drf_serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.permissions import IsAuthenticated
 
+from core import counters, filters, instrumentation, search
+from core.authentication import CachedTokenAuthentication, \
+                                 SignedTokenAuthentication
 from core.models import Tag, Ingredient, Recipe
+from core.routers import ReplicaReadMixin
+
+from recipe import fast, images, serializers
+from recipe.caching import CachedListMixin, CachedRetrieveMixin
+from recipe.pagination import NameCursorPagination, RecipeCursorPagination
+
+
+class BulkModelMixin:
+    """Create, update or delete many objects in a single request"""
+
+    def _bulk_ids(self, ids):
+        """Validate a list of object ids"""
+        ids = drf_serializers.ListField(
+            child=drf_serializers.IntegerField(),
+            allow_empty=False
+        ).run_validation(ids)
+        if len(set(ids)) != len(ids):
+            raise drf_serializers.ValidationError(_('Duplicated ids.'))
+
+        return ids
+
+    def _bulk_objects(self, ids):
+        """Return the user's objects with the given ids, in that order"""
+        objects = self.queryset.filter(user=self.request.user).in_bulk(ids)
+        missing = [id for id in ids if id not in objects]
+        if missing:
+            raise drf_serializers.ValidationError(
+                {'ids': _('Objects not found: %s.') % missing}
+            )
+
+        return [objects[id] for id in ids]
+
+    def get_bulk_queryset(self):
+        """Return the user's objects to serialize the written ones from
+
+        The filters of the request don't apply, as every written object
+        is returned.
+        """
+        return self.queryset.filter(user=self.request.user)
+
+    def _bulk_response(self, objs, status_code):
+        """Serialize the written objects as the list endpoint does"""
+        loaded = self.get_bulk_queryset().in_bulk([obj.pk for obj in objs])
+        serializer = self.get_serializer(
+            [loaded[obj.pk] for obj in objs],
+            many=True
+        )
+
+        return Response(serializer.data, status=status_code)
+
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk_create(self, request):
+        """Create a list of objects"""
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            objs = serializer.save(user=self.request.user)
+
+        return self._bulk_response(objs, status.HTTP_201_CREATED)
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request):
+        """Partially update a list of objects identified by their id"""
+        if not isinstance(request.data, list) or not all(
+                isinstance(item, dict) for item in request.data):
+            raise drf_serializers.ValidationError(
+                _('Expected a list of objects.')
+            )
+        ids = self._bulk_ids([item.get('id') for item in request.data])
+        serializer = self.get_serializer(
+            self._bulk_objects(ids),
+            data=request.data,
+            many=True,
+            partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            objs = serializer.save()
+
+        return self._bulk_response(objs, status.HTTP_200_OK)
+
+    def perform_bulk_destroy(self, queryset):
+        queryset.delete()
+
+    @bulk_create.mapping.delete
+    def bulk_destroy(self, request):
+        """Delete the objects whose ids are given in the ids list"""
+        data = request.data if isinstance(request.data, dict) else {}
+        ids = self._bulk_ids(data.get('ids'))
+        with transaction.atomic():
+            self._bulk_objects(ids)
+            self.perform_bulk_destroy(
+                self.queryset.filter(user=self.request.user, id__in=ids)
+            )
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class FastListMixin:
+    """List objects with a FastSerializer when the serializer allows it
 
-from recipe import serializers
+    Enabled by RECIPE_FAST_SERIALIZATION, the response data is the same
+    as the serializer's.
+    """
+    _fast_serializers = {}
 
+    def _fast_serializer(self):
+        """Return the FastSerializer of the serializer class, if any
 
-class BaseRecipeViewSet(viewsets.GenericViewSet,
+        It is shared by every request, so it is built from a serializer
+        without any request context.
+        """
+        serializer_class = self.get_serializer_class()
+        if serializer_class not in self._fast_serializers:
+            try:
+                serializer = fast.FastSerializer(serializer_class())
+            except TypeError:
+                serializer = None
+            self._fast_serializers[serializer_class] = serializer
+
+        return self._fast_serializers[serializer_class]
+
+    def list(self, request, *args, **kwargs):
+        serializer = self._fast_serializer() \
+            if settings.RECIPE_FAST_SERIALIZATION else None
+        if serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = ()
+        if self.paginator is not None:
+            ordering = self.paginator.get_ordering(request, queryset, self)
+            if isinstance(ordering, str):
+                ordering = (ordering,)
+        rows = serializer.rows(
+            queryset,
+            *(name.lstrip('-') for name in ordering)
+        )
+        page = self.paginate_queryset(rows)
+        with instrumentation.span('serialize'):
+            data = serializer.to_representation(
+                page if page is not None else list(rows)
+            )
+        if page is not None:
+            return self.get_paginated_response(data)
+
+        return Response(data)
+
+
+class BaseRecipeViewSet(ReplicaReadMixin,
+                        CachedListMixin,
+                        FastListMixin,
+                        BulkModelMixin,
+                        viewsets.GenericViewSet,
                         mixins.ListModelMixin,
                         mixins.CreateModelMixin
                         ):
     """Base ViewSet for Recipe Objects in the database"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,
+                              CachedTokenAuthentication)
     permission_classes = (IsAuthenticated,)
+    pagination_class = NameCursorPagination
+    orderings = {
+        'name': None,
+        'popular': ('-recipe_count', '-name', '-id'),
+    }
+
+    def _flag(self, name):
+        """Return whether a 0/1 query parameter is set"""
+        try:
+            return bool(int(self.request.query_params.get(name, 0)))
+        except ValueError:
+            raise drf_serializers.ValidationError(
+                {name: _('Expected 0 or 1.')}
+            )
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
-        queryset = self.queryset
-        if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+        field = Recipe._meta.get_field(self.recipe_field)
+        queryset = self.queryset.filter(user=self.request.user)
+        if self._flag('assigned_only'):
+            queryset = filters.filter_linked(queryset, field)
+        if self._flag('usage_count'):
+            queryset = queryset.annotate(usage_count=F('recipe_count'))
 
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-name').distinct()
+        return queryset.order_by('-name')
+
+    def get_pagination_ordering(self):
+        """Page the most used objects first with ordering=popular"""
+        ordering = self.request.query_params.get('ordering', 'name')
+        if ordering not in self.orderings:
+            raise drf_serializers.ValidationError(
+                {'ordering': _('Expected one of: %s.') %
+                 ', '.join(self.orderings)}
+            )
+
+        return self.orderings[ordering]
 
     def perform_create(self, serializer):
         """Create a new tag"""
@@ -39,43 +224,139 @@ class TagViewSet(BaseRecipeViewSet):
     """Manage tags in the database"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    recipe_field = 'tags'
 
 
 class IngredientViewSet(BaseRecipeViewSet):
     """Manage Ingredientes in the database"""
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    recipe_field = 'ingredients'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin,
+                    CachedListMixin,
+                    CachedRetrieveMixin,
+                    FastListMixin,
+                    BulkModelMixin,
+                    viewsets.ModelViewSet):
     """Manage recipes"""
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,
+                              CachedTokenAuthentication)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeCursorPagination
+    # Columns of the related objects in the detail representation
+    detail_relations = {
+        'tags': ('id', 'name'),
+        'ingredients': ('id', 'name'),
+    }
 
     def _params_to_ints(self, qs):
         """Convert of string ids to a list of int"""
-        return [int(id) for id in qs.split('|')]
+        try:
+            return [int(id) for id in qs.split('|')]
+        except ValueError:
+            raise drf_serializers.ValidationError(
+                _('Expected ids separated by "|".')
+            )
+
+    def _match_mode(self):
+        """Return whether recipes must match any or all the filter ids"""
+        match = self.request.query_params.get('match', filters.MATCH_ANY)
+        if match not in filters.MATCH_MODES:
+            raise drf_serializers.ValidationError(
+                {'match': _('Expected one of: %s.') %
+                 ', '.join(filters.MATCH_MODES)}
+            )
+
+        return match
 
     def get_queryset(self):
         """Retrieve the recipes for the autheticated user"""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
         queryset = self.queryset
+        if tags or ingredients:
+            match = self._match_mode()
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = filters.filter_by_related(
+                queryset, 'tags', tag_ids, match
+            )
 
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            queryset = filters.filter_by_related(
+                queryset, 'ingredients', ingredient_ids, match
+            )
 
-        return queryset.filter(user=self.request.user)
+        text = self.request.query_params.get('search')
+        if text:
+            queryset = search.search_recipes(queryset, text)
+
+        return self._apply_query_plan(
+            queryset.filter(user=self.request.user)
+        )
+
+    def get_bulk_queryset(self):
+        return self._apply_query_plan(super().get_bulk_queryset())
+
+    def get_pagination_ordering(self):
+        """Page ranked search results by rank"""
+        if self.request.query_params.get('search') and \
+                search.search_supported():
+            return ('-search_rank', 'id')
+
+        return None
+
+    def _related_prefetches(self, *fields):
+        """Prefetch the tags and ingredients loading only the given fields"""
+        return (
+            Prefetch('tags', queryset=Tag.objects.only(*fields)
+                     .order_by('id')),
+            Prefetch('ingredients', queryset=Ingredient.objects.only(*fields)
+                     .order_by('id')),
+        )
+
+    def _apply_query_plan(self, queryset):
+        """Load only the columns and relations the action serializes"""
+        fields = ('id', 'title', 'time_minutes', 'price', 'link', 'image')
+        if self.action in ('list', 'bulk_create', 'bulk_update'):
+            return queryset.only(*fields).prefetch_related(
+                *self._related_prefetches('id')
+            )
+        elif self.action == 'retrieve':
+            queryset = queryset.only(*fields)
+            if fast.aggregates_supported(queryset):
+                # Relations come in the same query, see get_object()
+                return fast.annotate_related_objects(
+                    queryset,
+                    self.detail_relations
+                )
+            return queryset.prefetch_related(
+                *self._related_prefetches('id', 'name')
+            )
+        elif self.action == 'export':
+            # Relations are prefetched per batch while streaming
+            return queryset.only(*fields)
+        elif self.action == 'upload_image':
+            # Saved with the loaded fields only, updated_at must be one
+            return queryset.only('id', 'image', 'updated_at')
+
+        return queryset
+
+    def get_object(self):
+        """Return the recipe, with its aggregated relations if any"""
+        recipe = super().get_object()
+        fast.attach_related_objects(recipe, self.detail_relations)
+
+        return recipe
 
     def get_serializer_class(self):
         """Return appropiate serializer class"""
-        if self.action == 'retrieve':
+        if self.action in ('retrieve', 'export'):
             return serializers.RecipeDetailSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
@@ -86,14 +367,60 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Create a new recipe"""
         serializer.save(user=self.request.user)
 
+    def perform_bulk_destroy(self, queryset):
+        """Delete the recipes, adjusting the counts of their relations once"""
+        counters.delete_recipes(queryset)
+
+    def _export_batch(self, recipes):
+        """Return the NDJSON lines of a batch of recipes"""
+        prefetch_related_objects(
+            recipes,
+            *self._related_prefetches('id', 'name')
+        )
+        serializer = self.get_serializer(recipes, many=True)
+
+        return ''.join(
+            json.dumps(data, cls=JSONEncoder, ensure_ascii=False) + '\n'
+            for data in serializer.data
+        )
+
+    def _export_lines(self, queryset):
+        """Yield the recipes as NDJSON, one batch of recipes at a time"""
+        batch_size = settings.RECIPE_EXPORT_BATCH_SIZE
+        batch = []
+        for recipe in queryset.order_by('id').iterator(chunk_size=batch_size):
+            batch.append(recipe)
+            if len(batch) == batch_size:
+                yield self._export_batch(batch)
+                batch = []
+        if batch:
+            yield self._export_batch(batch)
+
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """Stream the user's recipes as newline-delimited JSON"""
+        response = StreamingHttpResponse(
+            self._export_lines(self.get_queryset()),
+            content_type='application/x-ndjson'
+        )
+        response['Content-Disposition'] = \
+            'attachment; filename="recipes.ndjson"'
+
+        return response
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe"""
+        images.check_upload_size(request)
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
+            replaced = recipe.image.name
             serializer.save()
+            images.schedule_variants(recipe.image.name)
+            if replaced and replaced != recipe.image.name:
+                images.delete_replaced(replaced, recipe.image.storage)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
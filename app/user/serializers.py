@@ -3,8 +3,10 @@ from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from core.instrumentation import TimedDataMixin
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(TimedDataMixin, serializers.ModelSerializer):
     """Serializer for the User Object"""
 
     class Meta:
@@ -35,6 +37,8 @@ class AuthTokenSerializer(serializers.Serializer):
         style={'input_type': 'password'},
         trim_whitespace=False
     )
+    # Each device of a user holds its own token
+    device = serializers.CharField(max_length=100, default='')
 
     def validate(self, attrs):
         """Validate and authenticate the user"""
@@ -1,14 +1,19 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.models import DeviceToken
+
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
 ME_URL = reverse('user:me')
+REVOKE_URL = reverse('user:token-revoke')
 
 
 def create_user(**params):
@@ -21,6 +26,7 @@ class PublicUserApiTests(TestCase):
 
     def setUp(self):
         self.client = APIClient()
+        cache.clear()
 
     def test_create_valid_user_sucess(self):
         """Test creating user with valid payload is successful"""
@@ -135,6 +141,126 @@ class PublicUserApiTests(TestCase):
         self.assertNotIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_token_issued_per_device(self):
+        """Test each device gets its own token, rotated on every login"""
+        create_user(email='test@test.com', password='123456')
+        payload = {'email': 'test@test.com', 'password': '123456'}
+
+        phone = self.client.post(TOKEN_URL, {**payload, 'device': 'phone'})
+        laptop = self.client.post(TOKEN_URL, {**payload, 'device': 'laptop'})
+        rotated = self.client.post(TOKEN_URL, {**payload, 'device': 'phone'})
+
+        self.assertEqual(rotated.status_code, status.HTTP_200_OK)
+        self.assertIn('expires', rotated.data)
+        self.assertEqual(
+            set(DeviceToken.objects.values_list('key', flat=True)),
+            {laptop.data['token'], rotated.data['token']}
+        )
+        self.assertNotEqual(phone.data['token'], rotated.data['token'])
+
+    @override_settings(AUTH_TOKEN_MODE='signed')
+    def test_signed_token_issued(self):
+        """Test a signed token is issued in the signed token mode"""
+        create_user(email='test@test.com', password='123456')
+
+        res = self.client.post(
+            TOKEN_URL,
+            {'email': 'test@test.com', 'password': '123456'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(':', res.data['token'])
+        self.assertIn('expires', res.data)
+        self.assertFalse(DeviceToken.objects.exists())
+
+    def test_revoke_device_token(self):
+        """Test revoking the device token of the request deletes it"""
+        user = create_user(email='test@test.com', password='123456')
+        token = DeviceToken.objects.issue(user, 'phone')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        res = self.client.post(REVOKE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(DeviceToken.objects.exists())
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_rehashes_outdated_password(self):
+        """Test a password hashed by another hasher is rehashed on login"""
+        user = create_user(email='test@test.com', password='123456')
+        user.password = make_password('123456', hasher='pbkdf2_sha1')
+        user.save()
+
+        res = self.client.post(
+            TOKEN_URL,
+            {'email': 'test@test.com', 'password': '123456'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertFalse(user.password.startswith('pbkdf2_sha1$'))
+        self.assertTrue(user.check_password('123456'))
+
+    @override_settings(LOGIN_RATE_PER_EMAIL='2/min')
+    def test_login_throttled_per_email(self):
+        """Test logins to an account are throttled, from any address"""
+        create_user(email='test@test.com', password='123456')
+        payload = {'email': 'test@test.com', 'password': 'wrong'}
+        for ip in ('10.0.0.1', '10.0.0.2'):
+            res = self.client.post(TOKEN_URL, payload, REMOTE_ADDR=ip)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(
+            TOKEN_URL,
+            {'email': ' TEST@test.com', 'password': '123456'},
+            REMOTE_ADDR='10.0.0.3'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        res = self.client.post(
+            TOKEN_URL,
+            {'email': 'other@test.com', 'password': 'wrong'},
+            REMOTE_ADDR='10.0.0.3'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(LOGIN_RATE_PER_IP='2/min')
+    def test_login_throttled_per_ip(self):
+        """Test logins from an address are throttled, to any account"""
+        for i in range(2):
+            res = self.client.post(
+                TOKEN_URL,
+                {'email': f'user{i}@test.com', 'password': 'wrong'}
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(
+            TOKEN_URL,
+            {'email': 'user2@test.com', 'password': 'wrong'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(SIGNUP_RATE_PER_IP='1/hour')
+    def test_signup_throttled_per_ip(self):
+        """Test signups from an address are throttled"""
+        res = self.client.post(
+            CREATE_USER_URL,
+            {'email': 'user1@test.com', 'password': '123456', 'name': 'A'}
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.post(
+            CREATE_USER_URL,
+            {'email': 'user2@test.com', 'password': '123456', 'name': 'B'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertFalse(
+            get_user_model().objects.filter(email='user2@test.com').exists()
+        )
+
     def test_retrieve_user_unauthorized(self):
         """Test that authentication is required for users"""
         res = self.client.get(ME_URL)
@@ -0,0 +1,46 @@
+import hashlib
+
+from django.conf import settings
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SettingRateThrottle(SimpleRateThrottle):
+    """Rate throttle reading its rate from the rate_setting setting"""
+    rate_setting = None
+
+    def get_rate(self):
+        return getattr(settings, self.rate_setting)
+
+
+class LoginIPRateThrottle(SettingRateThrottle):
+    """Throttle the logins from an IP address"""
+    scope = 'login_ip'
+    rate_setting = 'LOGIN_RATE_PER_IP'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+
+class LoginEmailRateThrottle(SettingRateThrottle):
+    """Throttle the logins to an account, from any address"""
+    scope = 'login_email'
+    rate_setting = 'LOGIN_RATE_PER_EMAIL'
+
+    def get_cache_key(self, request, view):
+        email = request.data.get('email') \
+            if hasattr(request.data, 'get') else None
+        if not email or not isinstance(email, str):
+            return None
+        ident = hashlib.md5(email.strip().lower().encode()).hexdigest()
+
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class SignupIPRateThrottle(LoginIPRateThrottle):
+    """Throttle the signups from an IP address"""
+    scope = 'signup_ip'
+    rate_setting = 'SIGNUP_RATE_PER_IP'
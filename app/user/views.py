@@ -1,25 +1,76 @@
-from rest_framework import generics, authentication, permissions
+from django.conf import settings
+
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from core.authentication import CachedTokenAuthentication, \
+                                SignedTokenAuthentication, \
+                                SignedTokenUserAuthentication, \
+                                revoke_signed_token, sign_token
+from core.models import DeviceToken
+from core.routers import ReplicaReadMixin
 
 from user.serializers import UserSerializer, AuthTokenSerializer
+from user.throttles import LoginEmailRateThrottle, LoginIPRateThrottle, \
+                           SignupIPRateThrottle
 
 
 class CreateUserView(generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = UserSerializer
+    throttle_classes = (SignupIPRateThrottle,)
 
 
 class CreateTokenView(ObtainAuthToken):
     """Creates a new Auth token for a user"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    # Checked before the password is hashed
+    throttle_classes = (LoginIPRateThrottle, LoginEmailRateThrottle)
+
+    def post(self, request, *args, **kwargs):
+        """Issue a token to the device, replacing its previous one
+
+        In the signed AUTH_TOKEN_MODE, a signed token is issued instead.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        if settings.AUTH_TOKEN_MODE == 'signed':
+            key, expires = sign_token(user)
+        else:
+            token = DeviceToken.objects.issue(
+                user,
+                serializer.validated_data['device']
+            )
+            key, expires = token.key, token.expires
+
+        return Response({'token': key, 'expires': expires})
+
+
+class RevokeTokenView(APIView):
+    """Revoke the token authenticating the request"""
+    authentication_classes = (SignedTokenAuthentication,
+                              CachedTokenAuthentication)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        if isinstance(request.auth, DeviceToken):
+            request.auth.delete()
+        else:
+            revoke_signed_token(request.auth)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(ReplicaReadMixin, generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (SignedTokenUserAuthentication,
+                              CachedTokenAuthentication)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):